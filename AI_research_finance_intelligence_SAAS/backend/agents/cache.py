@@ -0,0 +1,139 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from ..config import settings
+
+
+def normalize(prompt):
+    return " ".join(prompt.lower().split())
+
+
+def namespace(model, instructions):
+    return hashlib.sha256("\n".join([model, *instructions]).encode()).hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=256)
+def openai_embed(text):
+    from openai import OpenAI
+
+    client = OpenAI(base_url=settings.OPENAI_BASE_URL)
+    return client.embeddings.create(model=settings.CACHE_EMBED_MODEL, input=text).data[0].embedding
+
+
+# Two-tier response cache. The exact tier is keyed by namespace + normalized
+# prompt. With a threshold > 0 misses fall through to a cosine-similarity scan
+# over the cached prompts' embeddings (a dense matrix rebuilt only after
+# writes). Both tiers share the same TTL and LRU bound.
+class ResponseCache:
+    def __init__(self, maxsize, ttl, threshold=0.0, embed=openai_embed):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.embed = embed
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._index = None
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def key(self, prompt, ns):
+        return hashlib.sha256(f"{ns}:{normalize(prompt)}".encode()).hexdigest()
+
+    def get(self, prompt, ns):
+        key = self.key(prompt, ns)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["expires"] > now:
+                self._entries.move_to_end(key)
+                return self._hit(entry)
+            if entry:
+                self._drop(key)
+
+        if self.threshold > 0:
+            entry = self._nearest(self.embed(normalize(prompt)), ns, now)
+            if entry is not None:
+                with self._lock:
+                    self.semantic_hits += 1
+                    return self._hit(entry)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, prompt, ns, response, latency):
+        vector = None
+        if self.threshold > 0:
+            import numpy as np
+
+            vector = np.asarray(self.embed(normalize(prompt)), dtype=np.float32)
+            vector /= np.linalg.norm(vector) or 1.0
+
+        key = self.key(prompt, ns)
+        with self._lock:
+            self._entries[key] = {
+                "ns": ns,
+                "response": response,
+                "latency": latency,
+                "vector": vector,
+                "expires": time.time() + self.ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+            self._index = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "latency_saved_seconds": round(self.saved_seconds, 3),
+            }
+
+    def _hit(self, entry):
+        self.hits += 1
+        self.saved_seconds += entry["latency"]
+        return entry["response"]
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        self._index = None
+
+    def _nearest(self, query, ns, now):
+        import numpy as np
+
+        query = np.asarray(query, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        with self._lock:
+            if self._index is None:
+                keys = [k for k, e in self._entries.items() if e["vector"] is not None]
+                matrix = np.stack([self._entries[k]["vector"] for k in keys]) if keys else None
+                self._index = (keys, matrix)
+            keys, matrix = self._index
+            if matrix is None:
+                return None
+            scores = matrix @ query
+            for i in np.argsort(scores)[::-1]:
+                if scores[i] < self.threshold:
+                    return None
+                entry = self._entries.get(keys[i])
+                if entry and entry["ns"] == ns and entry["expires"] > now:
+                    self._entries.move_to_end(keys[i])
+                    return entry
+        return None
+
+
+response_cache = ResponseCache(
+    settings.RESPONSE_CACHE_SIZE,
+    settings.RESPONSE_CACHE_TTL,
+    settings.SEMANTIC_CACHE_THRESHOLD,
+)
@@ -0,0 +1,43 @@
+import queue
+from ..config import settings
+
+INSTRUCTIONS = ["Answer professionally and concisely."]
+
+
+def build_team():
+    from agno.team import Team
+    from agno.models.openai import OpenAIChat
+
+    model = OpenAIChat(id=settings.OPENAI_MODEL, base_url=settings.OPENAI_BASE_URL)
+
+    return Team(
+        name="SaaS Agent",
+        model=model,
+        instructions=INSTRUCTIONS,
+    )
+
+
+# A Team keeps per-run state, so each one serves a single request at a time.
+# When every team is busy a new one is built instead of waiting; it is kept on
+# release only while fewer than `size` are idle.
+class AgentPool:
+
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self.factory()
+
+    def release(self, team):
+        try:
+            self._idle.put_nowait(team)
+        except queue.Full:
+            pass
+
+
+pool = AgentPool(build_team, settings.AGENT_POOL_SIZE)
@@ -1,9 +1,78 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from ..deps import get_current_user
-from .service import run_agent
+from ..background.tasks import TERMINAL, get_job
+from .cache import response_cache
+from .service import run_agent, stream_agent, submit_job
 
 router = APIRouter(prefix="/chat", tags=["AI"])
 
 @router.post("")
 def chat(prompt: str, user=Depends(get_current_user)):
     return {"response": run_agent(user, prompt)}
+
+
+async def sse(chunks):
+    try:
+        async for chunk in chunks:
+            yield f"data: {json.dumps({'token': chunk})}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    yield "event: done\ndata: {}\n\n"
+
+
+@router.post("/stream")
+async def chat_stream(prompt: str, user=Depends(get_current_user)):
+    chunks = await run_in_threadpool(stream_agent, user, prompt)
+    return StreamingResponse(
+        sse(chunks),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/cache/stats")
+def cache_stats(user=Depends(get_current_user)):
+    return response_cache.stats()
+
+
+@router.post("/jobs")
+def create_job(prompt: str, user=Depends(get_current_user)):
+    return {"job_id": submit_job(user, prompt), "status": "queued"}
+
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str, user=Depends(get_current_user)):
+    job = get_job(job_id, user.id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return job
+
+
+async def job_events(job_id, user_id, interval=1.0):
+    last = None
+    while True:
+        job = await run_in_threadpool(get_job, job_id, user_id)
+        if job is None:
+            break
+        if job["status"] != last:
+            last = job["status"]
+            yield f"data: {json.dumps(job)}\n\n"
+        if last in TERMINAL:
+            break
+        await asyncio.sleep(interval)
+    yield "event: done\ndata: {}\n\n"
+
+
+@router.get("/jobs/{job_id}/stream")
+async def job_stream(job_id: str, user=Depends(get_current_user)):
+    if await run_in_threadpool(get_job, job_id, user.id) is None:
+        raise HTTPException(404, "Job not found")
+    return StreamingResponse(
+        job_events(job_id, user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,16 +1,86 @@
-from agno.team import Team
-from agno.models.openai import OpenAIChat
+import time
+from ..background.tasks import jobs
+from ..config import settings
+from ..metrics import LLM_CALLS, STAGE_SECONDS, record_llm_usage, span
+from ..usage.limiter import check_limit, estimate_tokens
 from ..usage.tracker import track_usage
+from .cache import namespace, response_cache
+from .pool import INSTRUCTIONS, pool
+
+CACHE_NS = namespace(settings.OPENAI_MODEL, INSTRUCTIONS)
+
 
 def run_agent(user, prompt):
+    check_limit(user, estimate_tokens(prompt))
     track_usage(user, tokens=1)
+    return complete(prompt)
+
+
+def submit_job(user, prompt):
+    check_limit(user, estimate_tokens(prompt))
+    track_usage(user, tokens=1, action="job")
+    return jobs.enqueue(user, prompt)
+
+
+def complete(prompt):
+    with span("cache_lookup"):
+        cached = response_cache.get(prompt, CACHE_NS)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
+    with span("team_acquire"):
+        team = pool.acquire()
+    try:
+        with span("llm"):
+            output = team.run(prompt)
+        LLM_CALLS.inc(outcome="ok")
+        record_llm_usage(output)
+        content = output.content
+    except Exception:
+        LLM_CALLS.inc(outcome="error")
+        raise
+    finally:
+        pool.release(team)
+    response_cache.put(prompt, CACHE_NS, content, time.perf_counter() - started)
+    return content
+
+
+def stream_agent(user, prompt):
+    # limits and metering run before the response starts so errors keep their status code
+    check_limit(user, estimate_tokens(prompt))
+    track_usage(user, tokens=1)
+    with span("cache_lookup"):
+        cached = response_cache.get(prompt, CACHE_NS)
+    if cached is not None:
+        return _replay(cached)
+    return _stream(prompt)
+
 
-    model = OpenAIChat(id="gpt-4o-2024-11-20")
+async def _replay(content):
+    yield content
 
-    team = Team(
-        name="SaaS Agent",
-        model=model,
-        instructions=["Answer professionally and concisely."]
-    )
 
-    return team.run(prompt)
+async def _stream(prompt):
+    started = time.perf_counter()
+    chunks = []
+    event = None
+    with span("team_acquire"):
+        team = pool.acquire()
+    try:
+        with span("llm"):
+            async for event in team.arun(prompt, stream=True):
+                content = getattr(event, "content", None)
+                if isinstance(content, str) and content:
+                    if not chunks:
+                        STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm_first_token")
+                    chunks.append(content)
+                    yield content
+        LLM_CALLS.inc(outcome="ok")
+        record_llm_usage(event)
+    except Exception:
+        LLM_CALLS.inc(outcome="error")
+        raise
+    finally:
+        pool.release(team)
+    response_cache.put(prompt, CACHE_NS, "".join(chunks), time.perf_counter() - started)
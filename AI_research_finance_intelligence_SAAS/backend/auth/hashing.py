@@ -0,0 +1,57 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+from ..config import settings
+from . import jwt
+
+
+def pool_context():
+    # forking a worker that already runs threads (the event loop's executor,
+    # the job dispatcher) can copy a held lock into the child and deadlock it
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+# bcrypt is CPU bound and holds the GIL, so it runs in a small process pool.
+# At most `workers + max_pending` calls may be in flight; past that callers get
+# a 503 instead of queueing behind a login storm. A slot is held until the hash
+# actually finishes, even when the waiting request is cancelled.
+class PasswordHasher:
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(self.workers, mp_context=pool_context())
+        return self._executor
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(503, "Authentication busy, retry shortly", headers={"Retry-After": "1"})
+        try:
+            future = self.executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password):
+        return await self.run(jwt.hash_password, password)
+
+    async def verify_and_update(self, password, hashed):
+        return await self.run(jwt.verify_and_update, password, hashed)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+hasher = PasswordHasher(settings.HASH_WORKERS, settings.HASH_MAX_PENDING)
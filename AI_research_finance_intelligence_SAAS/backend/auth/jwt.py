@@ -1,26 +1,48 @@
+import functools
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from ..config import settings
+from ..metrics import span
 
-pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+@functools.lru_cache(maxsize=None)
+def pwd():
+    # passlib is only imported where hashing happens (the hasher processes)
+    from passlib.context import CryptContext
+
+    # pinning min/max to the configured cost makes needs_update() flag any hash
+    # made with a different cost, so login can rehash it
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+    )
+
 def hash_password(p: str):
-    return pwd.hash(p)
+    return pwd().hash(p)
 
 def verify_password(p, h):
-    return pwd.verify(p, h)
+    return pwd().verify(p, h)
+
+def verify_and_update(p, h):
+    return pwd().verify_and_update(p, h)
 
 def create_token(data: dict, expires: int):
     payload = data.copy()
     payload["exp"] = datetime.utcnow() + timedelta(minutes=expires)
     return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGO)
 
-def decode_token(token: str = Depends(oauth2_scheme)):
+def verify_token(token: str):
     try:
-        return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGO])
+        with span("jwt_verify"):
+            return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGO])
     except JWTError:
         raise HTTPException(401, "Invalid token")
+
+def decode_token(token: str = Depends(oauth2_scheme)):
+    return verify_token(token)
@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+from ..config import settings
+
+
+class Principal:
+    __slots__ = ("id", "email", "plan", "credits", "is_active", "claims")
+
+    def __init__(self, id, email, plan, credits, is_active, claims):
+        self.id = id
+        self.email = email
+        self.plan = plan
+        self.credits = credits
+        self.is_active = is_active
+        self.claims = claims
+
+    @classmethod
+    def from_user(cls, user, claims):
+        return cls(user.id, user.email, user.plan, user.credits, user.is_active, claims)
+
+
+# LRU of verified tokens -> Principal. Entries live until the token's `exp`
+# (capped by `ttl` so plan changes made by other workers are picked up) and
+# are dropped per user through `invalidate_user`.
+class PrincipalCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.time():
+                self._remove(token)
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def put(self, token, principal):
+        expires_at = min(principal.claims.get("exp", 0), time.time() + self.ttl)
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (expires_at, principal)
+            self._by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for token in list(self._by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, token):
+        _, principal = self._entries.pop(token)
+        tokens = self._by_user.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[principal.id]
+
+
+principal_cache = PrincipalCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
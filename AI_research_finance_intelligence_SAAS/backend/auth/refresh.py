@@ -0,0 +1,113 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from ..config import settings
+from ..database import SessionLocal
+from ..models import RevokedTokenFamily, UsedRefreshToken, User
+from .jwt import create_token, verify_token
+
+REFRESH_TTL = settings.REFRESH_EXPIRE_DAYS * 86400
+
+
+# Refresh-token ids that have already been exchanged, plus the token families
+# revoked after a reuse, kept in the app database so every worker and every
+# restart sees them. The jti primary key makes "first exchange wins" atomic.
+# Rows are kept only until the token they describe would have expired anyway.
+class DatabaseRevocations:
+    def __init__(self, sweep_interval=3600):
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def consume(self, jti, family, exp):
+        self._sweep()
+        db = SessionLocal()
+        try:
+            if db.get(RevokedTokenFamily, family) is not None:
+                return False
+            db.add(UsedRefreshToken(jti=jti, family=family, expires_at=datetime.utcfromtimestamp(exp)))
+            try:
+                db.commit()
+                return True
+            except IntegrityError:
+                db.rollback()
+            # a rotated token came back: assume it leaked and kill the family
+            db.add(RevokedTokenFamily(family=family, expires_at=datetime.utcnow() + timedelta(seconds=REFRESH_TTL)))
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # revoked concurrently
+            return False
+        finally:
+            db.close()
+
+    def _sweep(self):
+        now = time.time()
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.sweep_interval
+        db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow()
+            db.query(UsedRefreshToken).filter(UsedRefreshToken.expires_at < cutoff).delete(synchronize_session=False)
+            db.query(RevokedTokenFamily).filter(RevokedTokenFamily.expires_at < cutoff).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+class RedisRevocations:
+    # same rules with SET NX for the exchange; expiry is left to Redis TTLs
+    def __init__(self, client):
+        self.client = client
+
+    def consume(self, jti, family, exp):
+        if self.client.exists(f"refresh:revoked:{family}"):
+            return False
+        if self.client.set(f"refresh:used:{jti}", family, nx=True, ex=max(1, int(exp - time.time()))):
+            return True
+        self.client.set(f"refresh:revoked:{family}", 1, ex=REFRESH_TTL)
+        return False
+
+
+def get_store():
+    if settings.REVOCATION_BACKEND == "redis":
+        import redis
+
+        return RedisRevocations(redis.Redis.from_url(settings.REDIS_URL))
+    return DatabaseRevocations()
+
+
+revocations = get_store()
+
+
+def issue_tokens(email, family=None):
+    family = family or uuid.uuid4().hex
+    access = create_token({"sub": email, "type": "access"}, settings.ACCESS_EXPIRE_MIN)
+    refresh = create_token(
+        {"sub": email, "type": "refresh", "fam": family, "jti": uuid.uuid4().hex},
+        settings.REFRESH_EXPIRE_DAYS * 1440,
+    )
+    return {"access_token": access, "refresh_token": refresh}
+
+
+def rotate(refresh_token):
+    claims = verify_token(refresh_token)
+    if claims.get("type") != "refresh" or "jti" not in claims or "fam" not in claims:
+        raise HTTPException(401, "Invalid token")
+    # a refresh token outlives its access token, so the account is checked
+    # again here: deleted or deactivated users cannot renew their session
+    db = SessionLocal()
+    try:
+        active = db.query(User.is_active).filter(User.email == claims.get("sub")).scalar()
+    finally:
+        db.close()
+    if not active:
+        raise HTTPException(401, "Invalid token")
+    if not revocations.consume(claims["jti"], claims["fam"], claims["exp"]):
+        raise HTTPException(401, "Refresh token reused or revoked")
+    return issue_tokens(claims["sub"], claims["fam"])
@@ -1,33 +1,44 @@
 from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from ..database import SessionLocal
+from ..deps import get_db
 from ..models import User
-from .jwt import hash_password, verify_password, create_token
-from ..config import settings
+from .hashing import hasher
+from .refresh import issue_tokens, rotate
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-@router.post("/register")
-def register(email: str, password: str):
-    db = SessionLocal()
-    user = User(email=email, password=hash_password(password))
-    db.add(user)
+def find_user(db, email):
+    return db.query(User).filter(User.email == email).first()
+
+def save(db, obj):
+    db.add(obj)
     db.commit()
+
+@router.post("/register")
+async def register(email: str, password: str, db: Session = Depends(get_db)):
+    user = User(email=email, password=await hasher.hash(password))
+    await run_in_threadpool(save, db, user)
     return {"message": "registered"}
 
 @router.post("/login")
-def login(email: str, password: str):
-    db = SessionLocal()
-    user = db.query(User).filter(User.email == email).first()
-
-    if not user or not verify_password(password, user.password):
+async def login(email: str, password: str, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(find_user, db, email)
+    if not user:
         return {"error": "invalid credentials"}
 
-    access = create_token({"sub": user.email}, settings.ACCESS_EXPIRE_MIN)
-    refresh = create_token({"sub": user.email}, settings.REFRESH_EXPIRE_DAYS * 1440)
+    ok, new_hash = await hasher.verify_and_update(password, user.password)
+    if not ok:
+        return {"error": "invalid credentials"}
+    if new_hash:
+        user.password = new_hash
+        await run_in_threadpool(save, db, user)
 
     return {
-        "access_token": access,
-        "refresh_token": refresh,
+        **issue_tokens(user.email),
         "plan": user.plan
     }
+
+@router.post("/refresh")
+def refresh(refresh_token: str):
+    return rotate(refresh_token)
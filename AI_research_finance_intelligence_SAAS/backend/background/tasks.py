@@ -1,5 +1,221 @@
+import logging
+import os
+import socket
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import aliased
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Job, User
 
-def long_task(prompt: str):
-    time.sleep(5)
-    return f"Processed: {prompt}"
+log = logging.getLogger(__name__)
+
+TERMINAL = ("done", "failed")
+
+
+# Durable job queue on the app database. Jobs are rows in `jobs`; a dispatcher
+# thread claims queued rows with a conditional UPDATE that also counts the
+# user's running rows, so the plan cap holds across every worker process.
+# Claims carry the claiming process and a heartbeat; a claim whose heartbeat
+# goes stale (its process died) is put back in the queue by any live worker.
+class JobQueue:
+    def __init__(self, workers, poll_interval, user_concurrency, heartbeat=15, stale_after=60):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.user_concurrency = user_concurrency
+        self.heartbeat = heartbeat
+        self.stale_after = stale_after
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = None
+        self._active = 0
+        self._last_beat = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enqueue(self, user, prompt):
+        job_id = uuid.uuid4().hex
+        db = SessionLocal()
+        try:
+            db.add(Job(id=job_id, user_id=user.id, plan=user.plan, prompt=prompt, status="queued"))
+            db.commit()
+        finally:
+            db.close()
+        self._wake.set()
+        return job_id
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="job")
+        self._thread = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def requeue_stale(self):
+        # claims whose owner stopped heartbeating never finish; safe to run
+        # from any worker at any time, live claims are left alone
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        db = SessionLocal()
+        try:
+            requeued = (
+                db.query(Job)
+                .filter(Job.status == "running", (Job.heartbeat_at < cutoff) | Job.heartbeat_at.is_(None))
+                .update({"status": "queued", "owner": None, "heartbeat_at": None}, synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+        if requeued:
+            log.warning("requeued %d jobs with stale claims", requeued)
+        return requeued
+
+    def _beat(self):
+        db = SessionLocal()
+        try:
+            db.query(Job).filter(Job.status == "running", Job.owner == self.owner).update(
+                {"heartbeat_at": datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - self._last_beat >= self.heartbeat:
+                    self._last_beat = time.monotonic()
+                    self._beat()
+                    self.requeue_stale()
+                self._dispatch()
+            except Exception:
+                log.exception("job dispatch failed")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _claim(self, db, job_id, user_id, cap):
+        # lock the user row so concurrent claims for one user serialize on
+        # Postgres (SQLite already serializes writers), then claim only while
+        # the user's running count is under the cap
+        db.query(User.id).filter(User.id == user_id).with_for_update().first()
+        running = (
+            select(func.count())
+            .select_from(Job)
+            .where(Job.user_id == user_id, Job.status == "running")
+            .scalar_subquery()
+        )
+        claimed = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "queued", running < cap)
+            .values(status="running", owner=self.owner, heartbeat_at=datetime.utcnow())
+        ).rowcount
+        db.commit()
+        return claimed
+
+    def _candidates(self):
+        # each user's oldest queued jobs, only as many as they have free slots
+        # under their plan cap, so users already at the cap cannot fill the
+        # batch and starve everyone queued behind them
+        running_job = aliased(Job)
+        running = (
+            select(func.count())
+            .select_from(running_job)
+            .where(running_job.user_id == Job.user_id, running_job.status == "running")
+            .scalar_subquery()
+        )
+        cap = case(self.user_concurrency, value=Job.plan, else_=1)
+        queued = (
+            select(
+                Job.id,
+                Job.user_id,
+                Job.plan,
+                Job.created_at,
+                func.row_number().over(partition_by=Job.user_id, order_by=Job.created_at).label("rank"),
+                (cap - running).label("slots"),
+            )
+            .where(Job.status == "queued")
+            .subquery()
+        )
+        return (
+            select(queued.c.id, queued.c.user_id, queued.c.plan)
+            .where(queued.c.rank <= queued.c.slots)
+            .order_by(queued.c.created_at)
+        )
+
+    def _dispatch(self):
+        with self._lock:
+            free = self.workers - self._active
+        if free <= 0:
+            return
+
+        db = SessionLocal()
+        try:
+            queued = db.execute(self._candidates().limit(free * 4)).all()
+            for job_id, user_id, plan in queued:
+                if free <= 0:
+                    break
+                if not self._claim(db, job_id, user_id, self.user_concurrency.get(plan, 1)):
+                    continue
+                with self._lock:
+                    self._active += 1
+                free -= 1
+                self._executor.submit(self._run, job_id)
+        finally:
+            db.close()
+
+    def _run(self, job_id):
+        from ..agents.service import complete
+
+        db = SessionLocal()
+        try:
+            prompt = db.query(Job.prompt).filter(Job.id == job_id).scalar()
+            done = {"status": "done"}
+            try:
+                done["result"] = complete(prompt)
+            except Exception as e:
+                log.exception("job %s failed", job_id)
+                done = {"status": "failed", "error": str(e)}
+            # a claim that went stale and was handed to another worker is no longer ours
+            finished = (
+                db.query(Job)
+                .filter(Job.id == job_id, Job.status == "running", Job.owner == self.owner)
+                .update(done, synchronize_session=False)
+            )
+            db.commit()
+            if not finished:
+                log.warning("job %s was reclaimed before it finished; result dropped", job_id)
+        finally:
+            db.close()
+            with self._lock:
+                self._active -= 1
+            self._wake.set()
+
+
+def get_job(job_id, user_id):
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return {"id": job.id, "status": job.status, "result": job.result, "error": job.error}
+    finally:
+        db.close()
+
+
+jobs = JobQueue(
+    settings.JOB_WORKERS,
+    settings.JOB_POLL_INTERVAL,
+    settings.JOB_USER_CONCURRENCY,
+    settings.JOB_HEARTBEAT_SECONDS,
+    settings.JOB_STALE_SECONDS,
+)
@@ -0,0 +1,150 @@
+"""Load benchmark for /chat and /chat/stream against a stub agent.
+
+The stub stands in for the model server: building a team costs
+``--build-ms`` of CPU (client and Team construction), the first token
+arrives after ``--first-token-ms`` and each further token after
+``--token-ms``. Three configurations are compared:
+
+- ``chat``: the blocking ``POST /chat`` route with the agent pool, where the
+  first byte only arrives with the whole answer;
+- ``stream unpooled``: ``POST /chat/stream`` building a team per request,
+  as ``run_agent`` used to;
+- ``stream pooled``: ``POST /chat/stream`` with the process-wide pool.
+
+Server and load generator share one process, so absolute numbers are
+pessimistic; compare the rows with each other::
+
+    python -m backend.bench.chat_stream --requests 400 --concurrency 32
+"""
+
+from . import common  # noqa: F401  must come first, see common
+
+import argparse
+import asyncio
+import time
+
+from ..agents import service
+from ..agents.pool import AgentPool
+from ..config import settings
+from ..main import app
+
+
+class StubOutput:
+    def __init__(self, content):
+        self.content = content
+        self.metrics = None
+
+
+class StubTeam:
+    def __init__(self, first_token, per_token, tokens):
+        self.first_token = first_token
+        self.per_token = per_token
+        self.tokens = tokens
+
+    def run(self, prompt):
+        time.sleep(self.first_token + self.per_token * (self.tokens - 1))
+        return StubOutput("tok " * self.tokens)
+
+    async def arun(self, prompt, stream=True):
+        await asyncio.sleep(self.first_token)
+        for i in range(self.tokens):
+            if i:
+                await asyncio.sleep(self.per_token)
+            yield StubOutput("tok ")
+
+
+class Unpooled:
+    # every request builds its own team, as before the pool existed
+    def __init__(self, factory):
+        self.factory = factory
+
+    def acquire(self):
+        return self.factory()
+
+    def release(self, team):
+        pass
+
+
+def stub_factory(build, first_token, per_token, tokens):
+    def build_team():
+        deadline = time.perf_counter() + build
+        while time.perf_counter() < deadline:
+            pass
+        return StubTeam(first_token, per_token, tokens)
+    return build_team
+
+
+async def drive(base, token, route, requests, concurrency, tag):
+    import httpx
+
+    ttft, latency = [], []
+    counter = iter(range(requests))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def one(client, i):
+        # distinct prompts so the response cache never answers
+        started = time.perf_counter()
+        async with client.stream("POST", route, params={"prompt": f"{tag} question {i}"}, headers=headers) as resp:
+            resp.raise_for_status()
+            first = None
+            async for line in resp.aiter_lines():
+                if first is None and line.startswith("data:"):
+                    first = time.perf_counter()
+        done = time.perf_counter()
+        ttft.append((first or done) - started)
+        latency.append(done - started)
+
+    async def worker(client):
+        for i in counter:
+            await one(client, i)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as client:
+        await one(client, -1)  # warm up the connection and the pool
+        ttft.clear()
+        latency.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+    return ttft, latency, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTFT / RPS benchmark for the chat endpoints")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--build-ms", type=float, default=20)
+    parser.add_argument("--first-token-ms", type=float, default=100)
+    parser.add_argument("--token-ms", type=float, default=5)
+    parser.add_argument("--tokens", type=int, default=40)
+    args = parser.parse_args()
+
+    common.unlimited()
+    factory = stub_factory(args.build_ms / 1000, args.first_token_ms / 1000, args.token_ms / 1000, args.tokens)
+    _, token, _ = common.make_user("bench-chat@example.com")
+    configs = [
+        ("chat", "/chat", AgentPool(factory, settings.AGENT_POOL_SIZE)),
+        ("stream unpooled", "/chat/stream", Unpooled(factory)),
+        ("stream pooled", "/chat/stream", AgentPool(factory, settings.AGENT_POOL_SIZE)),
+    ]
+    rows = []
+    with common.serve(app) as base:
+        for name, route, pool in configs:
+            service.pool = pool
+            ttft, latency, wall = asyncio.run(drive(base, token, route, args.requests, args.concurrency, name))
+            rows.append({
+                "mode": name,
+                "ttft p50 ms": common.percentiles(ttft)["p50"],
+                "ttft p99 ms": common.percentiles(ttft)["p99"],
+                "total p50 ms": common.percentiles(latency)["p50"],
+                "rps": args.requests / wall,
+            })
+    common.report(
+        f"{args.requests} requests, concurrency {args.concurrency}, build {args.build_ms:g} ms, "
+        f"first token {args.first_token_ms:g} ms, {args.tokens} tokens x {args.token_ms:g} ms",
+        rows, ["mode", "ttft p50 ms", "ttft p99 ms", "total p50 ms", "rps"],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""/chat latency while logins hammer bcrypt.
+
+Clients call ``POST /chat`` (a stub agent that answers in ``--answer-ms``)
+while a second group logs in as fast as it can. Three rows:
+
+- ``idle``: no login traffic, the baseline;
+- ``threadpool``: bcrypt on the server's worker threads, as the sync login
+  handler ran it before the process pool, competing with ``/chat`` for them;
+- ``process pool``: bcrypt on ``PasswordHasher``.
+
+::
+
+    BCRYPT_ROUNDS=10 python -m backend.bench.chat_under_login
+"""
+
+from . import common  # noqa: F401  must come first, see common
+
+import argparse
+import asyncio
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..agents import service
+from ..agents.pool import AgentPool
+from ..auth import jwt, routes
+from ..auth.hashing import PasswordHasher
+from ..config import settings
+from ..main import app
+from .chat_stream import stub_factory
+from .login import warm_up
+
+EMAIL = "bench-login-load@example.com"
+
+
+class ThreadpoolHasher:
+    # what the sync login handler did: bcrypt on a server worker thread
+    async def hash(self, password):
+        return await run_in_threadpool(jwt.hash_password, password)
+
+    async def verify_and_update(self, password, hashed):
+        return await run_in_threadpool(jwt.verify_and_update, password, hashed)
+
+
+async def drive(base, token, requests, chat_clients, login_clients):
+    import httpx
+
+    chat, logins = [], 0
+    counter = iter(range(requests))
+    stop = asyncio.Event()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def chatter(client):
+        for i in counter:
+            started = time.perf_counter()
+            resp = await client.post("/chat", params={"prompt": f"load question {time.time_ns()} {i}"}, headers=headers)
+            resp.raise_for_status()
+            chat.append(time.perf_counter() - started)
+
+    async def login(client):
+        nonlocal logins
+        while not stop.is_set():
+            resp = await client.post("/auth/login", params={"email": EMAIL, "password": "bench-password"})
+            logins += resp.status_code == 200
+
+    clients = chat_clients + login_clients
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=300) as client:
+        loaders = [asyncio.create_task(login(client)) for _ in range(login_clients)]
+        await asyncio.sleep(0.5 if login_clients else 0)  # let the login queue build up
+        started = time.perf_counter()
+        await asyncio.gather(*(chatter(client) for _ in range(chat_clients)))
+        wall = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*loaders)
+    return chat, logins / wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/chat p99 with and without concurrent logins")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--chat-clients", type=int, default=8)
+    parser.add_argument("--login-clients", type=int, default=32)
+    parser.add_argument("--answer-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    common.unlimited()
+    service.pool = AgentPool(stub_factory(0, args.answer_ms / 1000, 0, 1), settings.AGENT_POOL_SIZE)
+    _, token, _ = common.make_user("bench-chat-load@example.com")
+    common.make_user(EMAIL, password_hash=jwt.hash_password("bench-password"))
+    pool = PasswordHasher(settings.HASH_WORKERS, settings.HASH_MAX_PENDING)
+    modes = [("idle", pool, 0), ("threadpool", ThreadpoolHasher(), args.login_clients),
+             (f"process pool x{settings.HASH_WORKERS}", pool, args.login_clients)]
+
+    rows = []
+    try:
+        asyncio.run(warm_up(pool))
+        with common.serve(app) as base:
+            for name, hasher, login_clients in modes:
+                routes.hasher = hasher
+                chat, logins = asyncio.run(drive(base, token, args.requests, args.chat_clients, login_clients))
+                rows.append({
+                    "login hashing": name,
+                    "logins/s": logins,
+                    "chat p50 ms": common.percentiles(chat)["p50"],
+                    "chat p99 ms": common.percentiles(chat)["p99"],
+                })
+    finally:
+        pool.shutdown()
+
+    common.report(
+        f"{args.requests} /chat requests from {args.chat_clients} clients, {args.answer_ms:g} ms answers, "
+        f"{args.login_clients} login clients, bcrypt rounds {settings.BCRYPT_ROUNDS}",
+        rows, ["login hashing", "logins/s", "chat p50 ms", "chat p99 ms"],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Shared setup for the benchmark scripts in this package.
+
+Import this module before anything else from ``backend``: it points the app at
+a scratch SQLite database unless ``DATABASE_URL`` is already set, and the
+settings are read once at import time.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+# passlib logs a traceback probing newer bcrypt builds for a version attribute
+logging.getLogger("passlib").setLevel(logging.ERROR)
+
+
+def percentiles(samples, points=(50, 99)):
+    """``{"p50": ms, "p99": ms}`` for a list of durations in seconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"p{p}": float("nan") for p in points}
+    return {f"p{p}": ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000 for p in points}
+
+
+@contextmanager
+def serve(app):
+    """Run ``app`` under uvicorn on an ephemeral port in a background thread; yields the base URL."""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", timeout_keep_alive=300))
+    thread = threading.Thread(target=server.run, name="bench-server", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("benchmark server failed to start")
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def make_user(email, password="bench-password", plan="pro", password_hash=None):
+    """Create (or reuse) a user and return ``(user_id, access_token, refresh_token)``."""
+    from ..auth.jwt import hash_password
+    from ..auth.refresh import issue_tokens
+    from ..database import Base, SessionLocal, engine
+    from ..models import User
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).first()
+        if user is None:
+            user = User(email=email, password=password_hash or hash_password(password), plan=plan, credits=10**9)
+            db.add(user)
+            db.commit()
+        user_id = user.id
+    finally:
+        db.close()
+    tokens = issue_tokens(email)
+    return user_id, tokens["access_token"], tokens["refresh_token"]
+
+
+def unlimited():
+    """Lift the plan rate limits so a benchmark measures the code path, not the limiter."""
+    from ..config import settings
+
+    for limits in settings.PLAN_LIMITS.values():
+        limits.update(rps=1e9, burst=1e9, tpm=1e12, plan_rps=1e9)
+
+
+def report(title, rows, columns):
+    """Print ``rows`` (dicts) as an aligned table."""
+    print(title)
+    widths = {c: max(len(c), *(len(_cell(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.rjust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(_cell(row[c]).rjust(widths[c]) for c in columns))
+    print()
+
+
+def _cell(value):
+    if isinstance(value, float):
+        return f"{value:.1f}"
+    return str(value)
@@ -0,0 +1,109 @@
+"""Per-request cost of ``get_current_user`` with and without the principal cache.
+
+Two measurements, each run with the cache disabled (every request verifies
+the JWT and loads the user row, as before the cache) and enabled:
+
+- ``call``: ``get_current_user`` invoked directly, in microseconds per call;
+- ``http``: ``GET /chat/cache/stats``, the cheapest authenticated route, under
+  concurrent clients, reported as latency percentiles and requests per second.
+
+::
+
+    python -m backend.bench.current_user --calls 5000 --requests 2000
+"""
+
+from . import common  # noqa: F401  must come first, see common
+
+import argparse
+import asyncio
+import time
+
+from .. import deps
+from ..auth.principal import PrincipalCache
+from ..config import settings
+from ..database import SessionLocal
+from ..main import app
+
+
+def time_calls(token, calls):
+    samples = []
+    db = SessionLocal()
+    try:
+        deps.get_current_user(token, db)
+        for _ in range(calls):
+            started = time.perf_counter()
+            deps.get_current_user(token, db)
+            samples.append(time.perf_counter() - started)
+    finally:
+        db.close()
+    return samples
+
+
+async def drive(base, token, requests, concurrency):
+    import httpx
+
+    samples = []
+    counter = iter(range(requests))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def worker(client):
+        for _ in counter:
+            started = time.perf_counter()
+            resp = await client.get("/chat/cache/stats", headers=headers)
+            resp.raise_for_status()
+            samples.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        (await client.get("/chat/cache/stats", headers=headers)).raise_for_status()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+    return samples, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="get_current_user cost with and without the principal cache")
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    common.unlimited()
+    _, token, _ = common.make_user("bench-auth@example.com")
+    caches = [
+        ("uncached", PrincipalCache(0, settings.AUTH_CACHE_TTL)),
+        ("cached", PrincipalCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)),
+    ]
+
+    rows = []
+    for name, cache in caches:
+        deps.principal_cache = cache
+        samples = time_calls(token, args.calls)
+        rows.append({
+            "mode": name,
+            "mean us": sum(samples) / len(samples) * 1e6,
+            "p50 us": common.percentiles(samples)["p50"] * 1000,
+            "p99 us": common.percentiles(samples)["p99"] * 1000,
+        })
+    common.report(f"get_current_user, {args.calls} direct calls", rows, ["mode", "mean us", "p50 us", "p99 us"])
+
+    rows = []
+    with common.serve(app) as base:
+        for name, cache in caches:
+            deps.principal_cache = cache
+            samples, wall = asyncio.run(drive(base, token, args.requests, args.concurrency))
+            rows.append({
+                "mode": name,
+                "p50 ms": common.percentiles(samples)["p50"],
+                "p99 ms": common.percentiles(samples)["p99"],
+                "rps": args.requests / wall,
+            })
+    common.report(
+        f"GET /chat/cache/stats, {args.requests} requests, concurrency {args.concurrency}",
+        rows, ["mode", "p50 ms", "p99 ms", "rps"],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Login/register throughput and event-loop latency under concurrent bcrypt.
+
+Concurrent clients log in (or register fresh accounts) while a probe polls
+``GET /health``, an ``async`` route that only answers once the event loop is
+free, so its latency is the loop stall that every other request also pays.
+The app is run twice: with bcrypt called inline on the event loop, as before
+the process pool, and with ``PasswordHasher``. A third section cancels a
+burst of in-flight hashes and checks every admission slot comes back once
+the workers finish.
+
+Hashing cost follows ``BCRYPT_ROUNDS``; lower it for a quicker run::
+
+    BCRYPT_ROUNDS=10 python -m backend.bench.login --clients 16 --requests 32
+"""
+
+from . import common  # noqa: F401  must come first, see common
+
+import argparse
+import asyncio
+import itertools
+import time
+
+from ..auth import jwt, routes
+from ..auth.hashing import PasswordHasher
+from ..config import settings
+from ..main import app
+
+
+class InlineHasher:
+    # bcrypt on the event loop, as the handlers did before the pool
+    async def hash(self, password):
+        return jwt.hash_password(password)
+
+    async def verify_and_update(self, password, hashed):
+        return jwt.verify_and_update(password, hashed)
+
+
+async def probe(client, stop, samples, every=0.01):
+    while not stop.is_set():
+        started = time.perf_counter()
+        (await client.get("/health")).raise_for_status()
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(every)
+
+
+async def drive(base, action, clients, requests, email):
+    import httpx
+
+    latency, lag, statuses = [], [], {}
+    counter = iter(range(requests))
+    emails = (f"bench-register-{n}@example.com" for n in itertools.count(time.time_ns()))
+
+    async def worker(client):
+        for _ in counter:
+            if action == "login":
+                params = {"email": email, "password": "bench-password"}
+            else:
+                params = {"email": next(emails), "password": "bench-password"}
+            started = time.perf_counter()
+            resp = await client.post(f"/auth/{action}", params=params)
+            latency.append(time.perf_counter() - started)
+            statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+    limits = httpx.Limits(max_connections=clients + 1, max_keepalive_connections=clients + 1)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=300) as client:
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, stop, lag))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(clients)))
+        wall = time.perf_counter() - started
+        stop.set()
+        await prober
+    return latency, lag, statuses, wall
+
+
+async def warm_up(hasher):
+    # start the pool's processes before the clock runs
+    await asyncio.gather(*(hasher.hash("warm-up") for _ in range(hasher.workers)))
+
+
+async def cancelled_burst(hasher, password_hash, burst):
+    calls = [asyncio.ensure_future(hasher.verify_and_update("bench-password", password_hash)) for _ in range(burst)]
+    await asyncio.sleep(0.05)
+    for call in calls:
+        call.cancel()
+    await asyncio.gather(*calls, return_exceptions=True)
+    during = hasher._slots._value
+    deadline = time.monotonic() + 120
+    while hasher._slots._value < hasher.workers + settings.HASH_MAX_PENDING and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    return during, hasher._slots._value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bcrypt throughput and event-loop latency, inline vs process pool")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=32)
+    args = parser.parse_args()
+
+    password_hash = jwt.hash_password("bench-password")
+    email = "bench-login@example.com"
+    common.make_user(email, password_hash=password_hash)
+    pool = PasswordHasher(settings.HASH_WORKERS, settings.HASH_MAX_PENDING)
+    modes = [("inline", InlineHasher()), (f"pool x{settings.HASH_WORKERS}", pool)]
+
+    rows = []
+    try:
+        asyncio.run(warm_up(pool))
+        with common.serve(app) as base:
+            for action in ("login", "register"):
+                for name, hasher in modes:
+                    routes.hasher = hasher
+                    latency, lag, statuses, wall = asyncio.run(drive(base, action, args.clients, args.requests, email))
+                    rows.append({
+                        "action": action,
+                        "hasher": name,
+                        "ok/s": statuses.get(200, 0) / wall,
+                        "503s": statuses.get(503, 0),
+                        "p99 ms": common.percentiles(latency)["p99"],
+                        "loop p50 ms": common.percentiles(lag)["p50"],
+                        "loop p99 ms": common.percentiles(lag)["p99"],
+                    })
+        burst = settings.HASH_WORKERS + settings.HASH_MAX_PENDING
+        during, after = asyncio.run(cancelled_burst(pool, password_hash, burst))
+    finally:
+        pool.shutdown()
+
+    common.report(
+        f"{args.requests} requests per row from {args.clients} clients, bcrypt rounds {settings.BCRYPT_ROUNDS}",
+        rows, ["action", "hasher", "ok/s", "503s", "p99 ms", "loop p50 ms", "loop p99 ms"],
+    )
+    print(f"{burst} verifies cancelled while queued: {during} slots free right after, {after} of {burst} once the pool drained")
+
+
+if __name__ == "__main__":
+    main()
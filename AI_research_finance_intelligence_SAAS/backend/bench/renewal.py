@@ -0,0 +1,93 @@
+"""Session renewal through ``/auth/refresh`` against a full ``/auth/login``.
+
+Each client keeps one session alive, either by rotating its own refresh
+token (an HMAC check, a revocation-store write and a user lookup) or by
+logging in again with its password (a bcrypt verify on ``PasswordHasher``),
+and the two are compared on throughput and latency::
+
+    python -m backend.bench.renewal --clients 16 --requests 400
+"""
+
+from . import common  # noqa: F401  must come first, see common
+
+import argparse
+import asyncio
+import time
+
+from ..auth import jwt, routes
+from ..auth.hashing import PasswordHasher
+from ..config import settings
+from ..main import app
+from .login import warm_up
+
+PASSWORD = "bench-password"
+
+
+async def drive(base, action, sessions, requests):
+    import httpx
+
+    latency, failures = [], 0
+    counter = iter(range(requests))
+
+    async def worker(client, email, refresh_token):
+        nonlocal failures
+        for _ in counter:
+            started = time.perf_counter()
+            if action == "refresh":
+                resp = await client.post("/auth/refresh", params={"refresh_token": refresh_token})
+            else:
+                resp = await client.post("/auth/login", params={"email": email, "password": PASSWORD})
+            latency.append(time.perf_counter() - started)
+            body = resp.json()
+            if resp.status_code != 200 or "refresh_token" not in body:
+                failures += 1
+                continue
+            refresh_token = sessions[email] = body["refresh_token"]
+
+    limits = httpx.Limits(max_connections=len(sessions), max_keepalive_connections=len(sessions))
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=300) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, email, token) for email, token in list(sessions.items())))
+        wall = time.perf_counter() - started
+    return latency, failures, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="refresh-token renewal vs password login")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--login-requests", type=int, default=64)
+    args = parser.parse_args()
+
+    password_hash = jwt.hash_password(PASSWORD)
+    sessions = {}
+    for i in range(args.clients):
+        email = f"bench-renew-{i}@example.com"
+        sessions[email] = common.make_user(email, password_hash=password_hash)[2]
+    routes.hasher = pool = PasswordHasher(settings.HASH_WORKERS, settings.HASH_MAX_PENDING)
+
+    rows = []
+    try:
+        asyncio.run(warm_up(pool))
+        with common.serve(app) as base:
+            for action, requests in (("refresh", args.requests), ("login", args.login_requests)):
+                latency, failures, wall = asyncio.run(drive(base, action, sessions, requests))
+                rows.append({
+                    "renewal": action,
+                    "requests": requests,
+                    "failed": failures,
+                    "ok/s": (requests - failures) / wall,
+                    "p50 ms": common.percentiles(latency)["p50"],
+                    "p99 ms": common.percentiles(latency)["p99"],
+                })
+    finally:
+        pool.shutdown()
+
+    common.report(
+        f"{args.clients} clients, revocation store {settings.REVOCATION_BACKEND}, bcrypt rounds {settings.BCRYPT_ROUNDS}",
+        rows, ["renewal", "requests", "failed", "ok/s", "p50 ms", "p99 ms"],
+    )
+
+
+if __name__ == "__main__":
+    main()
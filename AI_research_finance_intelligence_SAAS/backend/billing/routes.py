@@ -1,13 +1,34 @@
-from fastapi import APIRouter
-from .stripe import create_checkout
+import json
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from ..config import settings
+from ..deps import get_current_user
+from .stripe import checkout_url
+from .webhooks import inbox, verify_signature
 
 router = APIRouter(prefix="/billing")
 
 @router.post("/checkout")
-def checkout(price_id: str):
-    session = create_checkout(
+def checkout(price_id: str, user=Depends(get_current_user)):
+    url = checkout_url(
         price_id,
         "https://yourapp.com/success",
-        "https://yourapp.com/cancel"
+        "https://yourapp.com/cancel",
+        user.id,
     )
-    return {"url": session.url}
+    return {"url": url}
+
+@router.post("/webhook")
+async def webhook(request: Request, stripe_signature: str = Header(None)):
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        raise HTTPException(503, "Webhooks not configured")
+    payload = await request.body()
+    try:
+        verify_signature(payload, stripe_signature, settings.STRIPE_WEBHOOK_SECRET)
+        event = json.loads(payload)
+        event_id, event_type = event["id"], event["type"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(400, "Invalid payload")
+
+    await run_in_threadpool(inbox.receive, event_id, event_type, payload.decode())
+    return {"received": True}
@@ -1,12 +1,114 @@
-import stripe
+import functools
+import math
+import threading
+import time
+from fastapi import HTTPException
 from ..config import settings
 
-stripe.api_key = settings.STRIPE_SECRET
+@functools.lru_cache(maxsize=None)
+def client():
+    import requests
+    import stripe
+    from requests.adapters import HTTPAdapter
 
-def create_checkout(price_id, success, cancel):
-    return stripe.checkout.Session.create(
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.STRIPE_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    stripe.api_key = settings.STRIPE_SECRET
+    stripe.api_base = settings.STRIPE_API_BASE
+    stripe.max_network_retries = 1
+    # top-level since stripe 8, only under http_client before
+    requests_client = getattr(stripe, "RequestsClient", None) or stripe.http_client.RequestsClient
+    stripe.default_http_client = requests_client(timeout=settings.STRIPE_TIMEOUT, session=session)
+    return stripe
+
+
+def is_outage(error):
+    # 4xx responses are our own bad requests and must not open the breaker
+    status = getattr(error, "http_status", None)
+    return status is None or status == 429 or status >= 500
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def call(self, fn, *args, **kwargs):
+        with self._lock:
+            if self.opened_at is not None:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise HTTPException(
+                        503, "Billing temporarily unavailable",
+                        headers={"Retry-After": str(math.ceil(remaining))},
+                    )
+                # half-open: let this call probe, keep others out until it returns
+                self.opened_at = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                if is_outage(e):
+                    self.failures += 1
+                    if self.failures >= self.failure_threshold:
+                        self.opened_at = time.monotonic()
+                else:
+                    # Stripe answered, so it is up: close the breaker even
+                    # though this particular request was rejected
+                    self.failures = 0
+                    self.opened_at = None
+            raise
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+        return result
+
+
+breaker = CircuitBreaker(settings.STRIPE_BREAKER_FAILURES, settings.STRIPE_BREAKER_RESET)
+
+# (user id, price id) -> (reuse until, checkout url)
+_open_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def create_checkout(price_id, success, cancel, user_id):
+    # the user id rides along on the session and the subscription so webhook
+    # events can be mapped back to a User row
+    return breaker.call(
+        client().checkout.Session.create,
         mode="subscription",
         line_items=[{"price": price_id, "quantity": 1}],
         success_url=success,
         cancel_url=cancel,
+        client_reference_id=str(user_id),
+        subscription_data={"metadata": {"user_id": str(user_id)}},
     )
+
+
+def checkout_url(price_id, success, cancel, user_id):
+    key = (user_id, price_id)
+    now = time.time()
+    with _sessions_lock:
+        entry = _open_sessions.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+
+    session = create_checkout(price_id, success, cancel, user_id)
+    reuse_until = min(now + settings.CHECKOUT_REUSE_SECONDS, getattr(session, "expires_at", None) or math.inf)
+    with _sessions_lock:
+        for stale in [k for k, (until, _) in _open_sessions.items() if until <= now]:
+            del _open_sessions[stale]
+        _open_sessions[key] = (reuse_until, session.url)
+    return session.url
+
+
+def forget_sessions(user_id):
+    with _sessions_lock:
+        for key in [k for k in _open_sessions if k[0] == user_id]:
+            del _open_sessions[key]
@@ -0,0 +1,169 @@
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from ..auth.principal import principal_cache
+from ..config import settings
+from ..database import SessionLocal
+from ..models import StripeEvent, User
+from .stripe import forget_sessions
+
+log = logging.getLogger(__name__)
+
+
+def verify_signature(payload: bytes, header: str, secret: str, tolerance=settings.STRIPE_WEBHOOK_TOLERANCE):
+    timestamp, signatures = None, []
+    for item in (header or "").split(","):
+        key, _, value = item.strip().partition("=")
+        if key == "t":
+            timestamp = value
+        elif key == "v1":
+            signatures.append(value)
+    if not timestamp or not signatures:
+        raise ValueError("malformed signature header")
+
+    expected = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    if not any(hmac.compare_digest(expected, s) for s in signatures):
+        raise ValueError("signature mismatch")
+    if abs(time.time() - int(timestamp)) > tolerance:
+        raise ValueError("timestamp outside tolerance")
+
+
+def sign_payload(payload: bytes, secret: str, timestamp=None):
+    # builds a Stripe-Signature header, for replaying events against a local server
+    timestamp = int(timestamp or time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def user_id_of(event):
+    obj = event["data"]["object"]
+    if event["type"] == "checkout.session.completed":
+        ref = obj.get("client_reference_id")
+    elif event["type"] == "invoice.paid":
+        details = obj.get("subscription_details") or obj.get("parent", {}).get("subscription_details") or {}
+        ref = (details.get("metadata") or {}).get("user_id")
+    else:
+        ref = (obj.get("metadata") or {}).get("user_id")
+    return int(ref) if ref else None
+
+
+def plan_change(event):
+    # (plan or None, credits to add) for the events that affect an account
+    obj = event["data"]["object"]
+    paid = settings.PLAN_CREDITS["pro"]
+    if event["type"] == "checkout.session.completed":
+        return "pro", paid
+    if event["type"] == "invoice.paid" and obj.get("billing_reason") == "subscription_cycle":
+        return "pro", paid
+    if event["type"] == "customer.subscription.deleted":
+        return "free", 0
+    return None, 0
+
+
+# Deduplicating inbox: the webhook only inserts the raw event (primary key is
+# the Stripe event id, so retries are no-ops) and a consumer thread applies
+# pending events in batches, one transaction per batch. An event that cannot be
+# applied is marked with its error instead of failing the batch.
+class StripeInbox:
+    def __init__(self, batch_size, interval):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def receive(self, event_id, event_type, payload):
+        db = SessionLocal()
+        try:
+            db.add(StripeEvent(id=event_id, type=event_type, payload=payload))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        finally:
+            db.close()
+        self._wake.set()
+        return True
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="stripe-inbox", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                while self.process_batch() == self.batch_size:
+                    pass
+            except Exception:
+                log.exception("stripe inbox batch failed")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def process_batch(self):
+        db = SessionLocal()
+        try:
+            pending = (
+                db.query(StripeEvent.id, StripeEvent.payload)
+                .filter(StripeEvent.processed_at.is_(None))
+                .order_by(StripeEvent.received_at)
+                .limit(self.batch_size)
+                .all()
+            )
+            now = datetime.utcnow()
+            changes = {}
+            for event_id, payload in pending:
+                # claim inside the batch transaction so concurrent consumers skip it
+                claimed = (
+                    db.query(StripeEvent)
+                    .filter(StripeEvent.id == event_id, StripeEvent.processed_at.is_(None))
+                    .update({"processed_at": now}, synchronize_session=False)
+                )
+                if not claimed:
+                    continue
+                try:
+                    event = json.loads(payload)
+                    plan, credits = plan_change(event)
+                    user_id = user_id_of(event) if plan else None
+                except Exception as e:
+                    # poison event: it stays claimed so it cannot block the
+                    # events behind it, and the reason is kept for inspection
+                    log.warning("stripe event %s failed: %r", event_id, e)
+                    db.query(StripeEvent).filter(StripeEvent.id == event_id).update(
+                        {"error": f"{type(e).__name__}: {e}"}, synchronize_session=False
+                    )
+                    continue
+                if user_id is None:
+                    continue
+                change = changes.setdefault(user_id, {"plan": None, "credits": 0})
+                change["plan"] = plan
+                change["credits"] += credits
+
+            for user_id, change in changes.items():
+                db.query(User).filter(User.id == user_id).update(
+                    {"plan": change["plan"], "credits": User.credits + change["credits"]},
+                    synchronize_session=False,
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        for user_id in changes:
+            principal_cache.invalidate_user(user_id)
+            forget_sessions(user_id)
+        return len(pending)
+
+
+inbox = StripeInbox(settings.STRIPE_BATCH_SIZE, settings.STRIPE_BATCH_INTERVAL)
@@ -5,16 +5,67 @@ load_dotenv()
 
 class Settings:
     PROJECT_NAME = "AI SaaS Platform"
+    HOST = os.getenv("HOST", "0.0.0.0")
+    PORT = int(os.getenv("PORT", "8000"))
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+    MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "1") == "1"
     JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret")
     JWT_ALGO = "HS256"
     ACCESS_EXPIRE_MIN = 30
     REFRESH_EXPIRE_DAYS = 7
+    REVOCATION_BACKEND = os.getenv("REVOCATION_BACKEND", "db")
+    AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+    AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+    HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", "32"))
 
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
 
     STRIPE_SECRET = os.getenv("STRIPE_SECRET", "")
     STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+    STRIPE_API_BASE = os.getenv("STRIPE_API_BASE", "https://api.stripe.com")
+    STRIPE_TIMEOUT = float(os.getenv("STRIPE_TIMEOUT", "5"))
+    STRIPE_POOL_SIZE = int(os.getenv("STRIPE_POOL_SIZE", "10"))
+    STRIPE_BREAKER_FAILURES = int(os.getenv("STRIPE_BREAKER_FAILURES", "5"))
+    STRIPE_BREAKER_RESET = float(os.getenv("STRIPE_BREAKER_RESET", "30"))
+    CHECKOUT_REUSE_SECONDS = int(os.getenv("CHECKOUT_REUSE_SECONDS", "300"))
+    STRIPE_WEBHOOK_TOLERANCE = 300
+    STRIPE_BATCH_SIZE = int(os.getenv("STRIPE_BATCH_SIZE", "100"))
+    STRIPE_BATCH_INTERVAL = float(os.getenv("STRIPE_BATCH_INTERVAL", "1"))
+    PLAN_CREDITS = {"free": 50, "pro": 5000}
+
+    USAGE_FLUSH_SIZE = int(os.getenv("USAGE_FLUSH_SIZE", "500"))
+    USAGE_FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", "2"))
 
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+    JOB_USER_CONCURRENCY = {"free": 1, "pro": 3}
+    JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+    JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_IDLE_SECONDS = int(os.getenv("RATE_LIMIT_IDLE_SECONDS", "600"))
+    PLAN_LIMITS = {
+        "free": {"rps": 0.5, "burst": 3, "tpm": 4000, "plan_rps": 20},
+        "pro": {"rps": 5, "burst": 20, "tpm": 200000, "plan_rps": 200},
+    }
+
+    OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-2024-11-20")
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+    AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "8"))
+
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0"))
+    CACHE_EMBED_MODEL = os.getenv("CACHE_EMBED_MODEL", "text-embedding-3-small")
+
 settings = Settings()
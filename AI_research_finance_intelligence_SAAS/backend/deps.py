@@ -1,7 +1,10 @@
 from fastapi import Depends, HTTPException
 from sqlalchemy.orm import Session
-from .database import SessionLocal
-from .auth.jwt import decode_token
+from .database import AsyncSessionLocal, SessionLocal
+from .models import User
+from .auth.jwt import oauth2_scheme, verify_token
+from .auth.principal import Principal, principal_cache
+from .metrics import span
 
 def get_db():
     db = SessionLocal()
@@ -11,5 +14,26 @@ def get_db():
         db.close()
 
 
-def get_current_user(token: str = Depends(decode_token)):
-    return token
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("set DB_ASYNC=1 to use the async engine")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    claims = verify_token(token)
+    if claims.get("type") == "refresh":
+        raise HTTPException(401, "Invalid token")
+    with span("user_lookup"):
+        user = db.query(User).filter(User.email == claims.get("sub")).first()
+    if not user or not user.is_active:
+        raise HTTPException(401, "Invalid token")
+
+    principal = Principal.from_user(user, claims)
+    principal_cache.put(token, principal)
+    return principal
@@ -1,12 +1,31 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .database import Base, engine
+from fastapi.responses import PlainTextResponse
+from .config import settings
 from .auth.routes import router as auth_router
 from .agents.runner import router as chat_router
 from .billing.routes import router as billing_router
+from .background.tasks import jobs
+from .auth.hashing import hasher
+from .billing.webhooks import inbox
+from .server import migrate
+from .metrics import MetricsMiddleware, render
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # `python -m backend.server` migrates once before spawning workers and
+    # turns this off; plain `uvicorn backend.main:app` still migrates here
+    if settings.MIGRATE_ON_STARTUP:
+        migrate()
+    jobs.start()
+    inbox.start()
+    yield
+    inbox.stop()
+    jobs.stop()
+    hasher.shutdown()
 
-app = FastAPI(title="AI SaaS Platform")
+app = FastAPI(title="AI SaaS Platform", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth_router)
 app.include_router(chat_router)
@@ -15,3 +34,11 @@ app.include_router(billing_router)
 @app.get("/")
 def root():
     return {"status": "running"}
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -22,3 +22,45 @@ class UsageLog(Base):
     action = Column(String)
     tokens = Column(Integer)
     created_at = Column(DateTime, server_default=func.now())
+
+
+class UsedRefreshToken(Base):
+    __tablename__ = "used_refresh_tokens"
+
+    jti = Column(String, primary_key=True)
+    family = Column(String)
+    expires_at = Column(DateTime, index=True)
+
+
+class RevokedTokenFamily(Base):
+    __tablename__ = "revoked_token_families"
+
+    family = Column(String, primary_key=True)
+    expires_at = Column(DateTime, index=True)
+
+
+class StripeEvent(Base):
+    __tablename__ = "stripe_events"
+
+    id = Column(String, primary_key=True)
+    type = Column(String)
+    payload = Column(Text)
+    received_at = Column(DateTime, server_default=func.now())
+    processed_at = Column(DateTime, index=True)
+    error = Column(Text)
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    plan = Column(String)
+    prompt = Column(Text)
+    status = Column(String, default="queued", index=True)
+    owner = Column(String)
+    heartbeat_at = Column(DateTime)
+    result = Column(Text)
+    error = Column(Text)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
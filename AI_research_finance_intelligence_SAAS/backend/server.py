@@ -0,0 +1,78 @@
+import argparse
+import importlib
+import logging
+import os
+import sys
+import time
+from .config import settings
+
+log = logging.getLogger("backend.server")
+
+# imported on first use by the agent, billing and auth code paths
+DEFERRED_MODULES = ["agno", "openai", "stripe", "passlib", "numpy", "redis"]
+
+
+def add_missing_columns(engine, metadata):
+    # create_all only creates missing tables; add nullable columns that were
+    # introduced since an existing table was created
+    from sqlalchemy import inspect, text
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    kind = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {kind}"))
+
+
+def migrate():
+    # schema only: every worker may run this under plain uvicorn, so it must
+    # not touch job claims (each dispatcher requeues stale ones itself)
+    from .database import Base, engine
+    from . import models  # noqa: F401  registers the tables
+
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine, Base.metadata)
+
+
+def report_import_costs():
+    started = time.perf_counter()
+    importlib.import_module("backend.main")
+    log.info("backend.main imported in %.1f ms", (time.perf_counter() - started) * 1000)
+    for name in DEFERRED_MODULES:
+        state = "loaded at startup" if name in sys.modules else "deferred"
+        log.info("  %-8s %s", name, state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API server")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_WORKERS)
+    parser.add_argument("--migrate-only", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    started = time.perf_counter()
+    migrate()
+    log.info("migrations applied in %.1f ms", (time.perf_counter() - started) * 1000)
+    if args.migrate_only:
+        return
+
+    # workers inherit the environment; the in-process app reads settings directly
+    os.environ["MIGRATE_ON_STARTUP"] = "0"
+    settings.MIGRATE_ON_STARTUP = False
+    report_import_costs()
+
+    import uvicorn
+
+    uvicorn.run("backend.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,118 @@
-def check_limit(user):
+import math
+import threading
+import time
+from collections import OrderedDict
+from fastapi import HTTPException
+from ..config import settings
+
+
+class MemoryBuckets:
+    # key -> [level, last refill]; oldest-touched first so idle buckets are
+    # evicted from the front in O(1) per bucket.
+    def __init__(self, idle_seconds):
+        self.idle_seconds = idle_seconds
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, buckets):
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            levels = []
+            wait = 0.0
+            for key, rate, capacity, cost in buckets:
+                level, ts = self._buckets.get(key, (capacity, now))
+                level = min(capacity, level + (now - ts) * rate)
+                levels.append(level)
+                if level < cost:
+                    wait = max(wait, (cost - level) / rate)
+            if wait:
+                return wait
+            for (key, rate, capacity, cost), level in zip(buckets, levels):
+                self._buckets[key] = [level - cost, now]
+                self._buckets.move_to_end(key)
+            return 0.0
+
+    def _evict(self, now):
+        while self._buckets:
+            key, (_, ts) = next(iter(self._buckets.items()))
+            if now - ts < self.idle_seconds:
+                break
+            del self._buckets[key]
+
+
+REDIS_SCRIPT = """
+local now = tonumber(ARGV[1])
+local idle = tonumber(ARGV[2])
+local levels = {}
+local wait = 0
+for i = 1, #KEYS do
+    local rate = tonumber(ARGV[i * 3])
+    local capacity = tonumber(ARGV[i * 3 + 1])
+    local cost = tonumber(ARGV[i * 3 + 2])
+    local bucket = redis.call('HMGET', KEYS[i], 'level', 'ts')
+    local level = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    level = math.min(capacity, level + math.max(0, now - ts) * rate)
+    levels[i] = level
+    if level < cost then
+        wait = math.max(wait, (cost - level) / rate)
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i = 1, #KEYS do
+    redis.call('HSET', KEYS[i], 'level', levels[i] - tonumber(ARGV[i * 3 + 2]), 'ts', now)
+    redis.call('EXPIRE', KEYS[i], idle)
+end
+return '0'
+"""
+
+
+class RedisBuckets:
+    # same algorithm as MemoryBuckets, run atomically server-side so every
+    # worker shares one set of buckets; idle keys are dropped by EXPIRE
+    def __init__(self, client, idle_seconds):
+        self.idle_seconds = idle_seconds
+        self._script = client.register_script(REDIS_SCRIPT)
+
+    def acquire(self, buckets):
+        keys = [f"ratelimit:{key}" for key, *_ in buckets]
+        args = [time.time(), self.idle_seconds]
+        for _, rate, capacity, cost in buckets:
+            args += [rate, capacity, cost]
+        return float(self._script(keys=keys, args=args))
+
+
+def get_backend():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        import redis
+
+        return RedisBuckets(redis.Redis.from_url(settings.REDIS_URL), settings.RATE_LIMIT_IDLE_SECONDS)
+    return MemoryBuckets(settings.RATE_LIMIT_IDLE_SECONDS)
+
+
+limiter = get_backend()
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def check_limit(user, tokens=0):
     if user.plan == "free" and user.credits <= 0:
-        raise Exception("Upgrade required")
+        raise HTTPException(402, "Upgrade required")
+
+    limits = settings.PLAN_LIMITS.get(user.plan, settings.PLAN_LIMITS["free"])
+    buckets = [
+        (f"rps:{user.id}", limits["rps"], limits["burst"], 1),
+        (f"plan:{user.plan}", limits["plan_rps"], limits["plan_rps"], 1),
+    ]
+    if tokens:
+        tpm = limits["tpm"]
+        buckets.append((f"tpm:{user.id}", tpm / 60, tpm, min(tokens, tpm)))
+
+    wait = limiter.acquire(buckets)
+    if wait:
+        raise HTTPException(429, "Rate limit exceeded", headers={"Retry-After": str(math.ceil(wait))})
@@ -0,0 +1,75 @@
+import atexit
+import logging
+import threading
+from datetime import datetime
+from sqlalchemy import insert
+from ..config import settings
+from ..database import SessionLocal
+from ..models import UsageLog
+
+log = logging.getLogger(__name__)
+
+
+# Write-behind buffer for UsageLog rows: events are appended in memory and a
+# daemon thread bulk-inserts them once `batch_size` rows are pending or every
+# `interval` seconds, whichever comes first.
+class UsageLogWriter:
+    def __init__(self, batch_size, interval):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._rows = []
+        self._lock = threading.Lock()
+        # serialises flushes so one (e.g. atexit) returns only after an in-flight batch is written
+        self._flushing = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, user_id, action, tokens):
+        row = {
+            "user_id": user_id,
+            "action": action,
+            "tokens": tokens,
+            "created_at": datetime.utcnow(),
+        }
+        with self._lock:
+            self._rows.append(row)
+            pending = len(self._rows)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="usage-log-writer", daemon=True)
+                self._thread.start()
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def flush(self):
+        with self._flushing:
+            return self._flush()
+
+    def _flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+
+        db = SessionLocal()
+        try:
+            db.execute(insert(UsageLog), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            log.exception("usage log flush failed, requeueing %d rows", len(rows))
+            with self._lock:
+                self._rows[:0] = rows
+            return 0
+        finally:
+            db.close()
+        return len(rows)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+
+usage_log = UsageLogWriter(settings.USAGE_FLUSH_SIZE, settings.USAGE_FLUSH_INTERVAL)
+atexit.register(usage_log.flush)
@@ -1,5 +1,35 @@
-from .limiter import check_limit
+from fastapi import HTTPException
+from sqlalchemy import or_, update
+from ..auth.principal import principal_cache
+from ..database import SessionLocal
+from ..metrics import span
+from ..models import User
+from .logs import usage_log
 
-def track_usage(user, tokens=1):
-    check_limit(user)
-    user.credits -= tokens
+def charge_credits(db, user_id, tokens):
+    # single conditional UPDATE so concurrent workers can never overdraw a free account
+    stmt = (
+        update(User)
+        .where(User.id == user_id, or_(User.plan != "free", User.credits >= tokens))
+        .values(credits=User.credits - tokens)
+        .returning(User.credits)
+    )
+    balance = db.execute(stmt).scalar_one_or_none()
+    db.commit()
+    return balance
+
+def track_usage(user, tokens=1, action="chat"):
+    with span("track_usage"):
+        db = SessionLocal()
+        try:
+            balance = charge_credits(db, user.id, tokens)
+        finally:
+            db.close()
+
+    if balance is None:
+        principal_cache.invalidate_user(user.id)
+        raise HTTPException(402, "Upgrade required")
+
+    user.credits = balance
+    usage_log.add(user.id, action, tokens)
+    return balance
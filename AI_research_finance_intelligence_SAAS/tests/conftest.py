@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# the backend reads its settings at import time, so point it at a scratch database first
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+os.environ.setdefault("MIGRATE_ON_STARTUP", "0")
+
+import pytest
+
+from backend import models
+from backend.database import Base, SessionLocal, engine
+
+
+@pytest.fixture(autouse=True)
+def schema():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+
+
+@pytest.fixture
+def make_user():
+    counter = iter(range(1, 1_000_000))
+
+    def make(plan="free", credits=50):
+        db = SessionLocal()
+        try:
+            user = models.User(email=f"user{next(counter)}@example.com", password="x", plan=plan, credits=credits)
+            db.add(user)
+            db.commit()
+            db.refresh(user)
+            db.expunge(user)
+            return user
+        finally:
+            db.close()
+
+    return make
@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from backend.auth import jwt, routes
+from backend.auth.hashing import PasswordHasher
+from backend.config import settings
+from backend.database import SessionLocal
+from backend.models import User
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_pending=0)
+    yield hasher
+    hasher.shutdown()
+
+
+class InlineHasher:
+    # runs in this process so the test can change the configured cost
+    async def verify_and_update(self, password, hashed):
+        return jwt.verify_and_update(password, hashed)
+
+
+@pytest.fixture
+def rounds(monkeypatch):
+    def use(n):
+        monkeypatch.setattr(settings, "BCRYPT_ROUNDS", n)
+        jwt.pwd.cache_clear()
+
+    yield use
+    jwt.pwd.cache_clear()
+
+
+def stored_hash(email):
+    db = SessionLocal()
+    try:
+        return db.query(User.password).filter(User.email == email).scalar()
+    finally:
+        db.close()
+
+
+def test_pool_does_not_fork_the_server(hasher):
+    assert asyncio.run(hasher.run(sum, [1, 2, 3])) == 6
+    assert hasher.executor()._mp_context.get_start_method() in ("forkserver", "spawn")
+
+
+def test_cancelled_request_keeps_its_slot_until_the_job_finishes(hasher):
+    async def scenario():
+        await hasher.run(time.sleep, 0)  # start the worker process
+        slow = asyncio.create_task(hasher.run(time.sleep, 0.5))
+        await asyncio.sleep(0.1)
+        slow.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await slow
+        # the sleep is still running in the worker, so the only slot is taken
+        with pytest.raises(HTTPException) as exc:
+            await hasher.run(time.sleep, 0)
+        assert exc.value.status_code == 503
+        await asyncio.sleep(0.8)
+        await hasher.run(time.sleep, 0)
+
+    asyncio.run(scenario())
+
+
+def test_login_rehashes_a_password_made_at_another_cost(rounds, monkeypatch):
+    monkeypatch.setattr(routes, "hasher", InlineHasher())
+    rounds(4)
+    stale = jwt.hash_password("secret")
+    db = SessionLocal()
+    try:
+        db.add(User(email="old@example.com", password=stale))
+        db.commit()
+    finally:
+        db.close()
+
+    rounds(5)
+    app = FastAPI()
+    app.include_router(routes.router)
+    client = TestClient(app)
+
+    def login(password):
+        return client.post("/auth/login", params={"email": "old@example.com", "password": password}).json()
+
+    assert login("wrong") == {"error": "invalid credentials"}
+    assert stored_hash("old@example.com") == stale
+
+    assert "access_token" in login("secret")
+    upgraded = stored_hash("old@example.com")
+    assert upgraded.startswith("$2b$05$")
+    assert jwt.verify_password("secret", upgraded)
+
+    # already at the configured cost, so nothing is rewritten
+    login("secret")
+    assert stored_hash("old@example.com") == upgraded
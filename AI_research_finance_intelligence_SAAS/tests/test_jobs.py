@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+from backend.background.tasks import JobQueue
+from backend.database import SessionLocal
+from backend.models import Job
+
+
+class Inline:
+    # collects submitted jobs instead of running them
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append((fn, args))
+
+
+def worker(workers=4, **kwargs):
+    queue = JobQueue(workers=workers, poll_interval=1, user_concurrency={"free": 1, "pro": 2}, **kwargs)
+    queue._executor = Inline()
+    return queue
+
+
+def statuses():
+    db = SessionLocal()
+    try:
+        return {job.id: (job.status, job.owner) for job in db.query(Job)}
+    finally:
+        db.close()
+
+
+def test_user_cap_holds_across_workers(make_user):
+    user = make_user(plan="pro")
+    # one slot per process, so only the plan cap stops the third worker
+    first, second, third = worker(1), worker(1), worker(1)
+    ids = [first.enqueue(user, f"prompt {i}") for i in range(5)]
+
+    for queue in (first, second, third):
+        queue._dispatch()
+
+    running = [job_id for job_id in ids if statuses()[job_id][0] == "running"]
+    assert len(running) == 2
+    assert len({statuses()[job_id][1] for job_id in running}) == 2
+    assert [len(q._executor.submitted) for q in (first, second, third)] == [1, 1, 0]
+
+
+def test_caps_are_per_user(make_user):
+    alice, bob = make_user(plan="free"), make_user(plan="free")
+    queue = worker()
+    for user in (alice, bob, alice, bob):
+        queue.enqueue(user, "prompt")
+    queue._dispatch()
+    assert len(queue._executor.submitted) == 2
+
+
+def test_a_backlog_at_its_cap_does_not_starve_other_users(make_user):
+    hog, other = make_user(plan="free"), make_user(plan="free")
+    queue = worker()
+    backlog = [queue.enqueue(hog, f"prompt {i}") for i in range(20)]
+    late = queue.enqueue(other, "prompt")
+
+    # order the queue explicitly, created_at has one-second resolution on SQLite
+    start = datetime.utcnow() - timedelta(minutes=1)
+    db = SessionLocal()
+    try:
+        for i, job_id in enumerate(backlog + [late]):
+            db.query(Job).filter(Job.id == job_id).update({"created_at": start + timedelta(seconds=i)})
+        db.commit()
+    finally:
+        db.close()
+
+    queue._dispatch()
+    assert statuses()[backlog[0]][0] == "running"
+    assert statuses()[late][0] == "running"
+    assert [args[0] for _, args in queue._executor.submitted] == [backlog[0], late]
+
+
+def test_only_stale_claims_are_requeued(make_user, monkeypatch):
+    user = make_user(plan="pro")
+    dead, live, sweeper = worker(), worker(), worker(stale_after=60)
+    dead_job = dead.enqueue(user, "a")
+    dead._dispatch()
+    live_job = live.enqueue(user, "b")
+    live._dispatch()
+
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == dead_job).update({"heartbeat_at": datetime.utcnow() - timedelta(minutes=5)})
+        db.commit()
+    finally:
+        db.close()
+
+    assert sweeper.requeue_stale() == 1
+    assert statuses()[dead_job] == ("queued", None)
+    assert statuses()[live_job] == ("running", live.owner)
+
+
+def test_reclaimed_job_keeps_the_new_owners_result(make_user, monkeypatch):
+    monkeypatch.setattr("backend.agents.service.complete", lambda prompt: f"answer to {prompt}")
+    user = make_user(plan="free")
+    dead, other = worker(stale_after=0), worker()
+    job_id = dead.enqueue(user, "q")
+    dead._dispatch()
+    dead.requeue_stale()
+    other._dispatch()
+
+    dead._active += 1
+    dead._run(job_id)
+    assert statuses()[job_id] == ("running", other.owner)
+
+    fn, args = other._executor.submitted[0]
+    fn(*args)
+    assert statuses()[job_id] == ("done", other.owner)
+
+
+def test_worker_startup_leaves_sibling_claims_alone(make_user):
+    from backend.server import migrate
+
+    user = make_user(plan="pro")
+    sibling = worker()
+    job_id = sibling.enqueue(user, "q")
+    sibling._dispatch()
+
+    # a second `uvicorn --workers` process starting up
+    migrate()
+    worker()._dispatch()
+    assert statuses()[job_id] == ("running", sibling.owner)
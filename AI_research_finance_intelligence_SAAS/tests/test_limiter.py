@@ -0,0 +1,81 @@
+import pytest
+from fastapi import HTTPException
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from backend.usage import limiter as limiter_module
+from backend.usage.limiter import MemoryBuckets, RedisBuckets, check_limit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # memory buckets read the monotonic clock, the Lua script gets wall time
+    monkeypatch.setattr(limiter_module.time, "monotonic", clock)
+    monkeypatch.setattr(limiter_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "redis"])
+def buckets(request, clock):
+    if request.param == "memory":
+        return MemoryBuckets(idle_seconds=3600)
+    return RedisBuckets(fakeredis.FakeRedis(), idle_seconds=3600)
+
+
+def test_burst_then_wait(buckets):
+    bucket = [("rps:1", 0.5, 3, 1)]
+    assert [buckets.acquire(bucket) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.acquire(bucket) == pytest.approx(2.0)
+
+
+def test_refill_is_capped_at_capacity(buckets, clock):
+    bucket = [("rps:1", 0.5, 3, 1)]
+    for _ in range(3):
+        buckets.acquire(bucket)
+    clock.now += 2
+    assert buckets.acquire(bucket) == 0.0
+    assert buckets.acquire(bucket) == pytest.approx(2.0)
+
+    clock.now += 3600 - 1
+    assert [buckets.acquire(bucket) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.acquire(bucket) > 0
+
+
+def test_all_buckets_or_none(buckets):
+    user = ("rps:1", 10, 10, 1)
+    tokens = ("tpm:1", 100 / 60, 100, 80)
+    assert buckets.acquire([user, tokens]) == 0.0
+    # the token bucket refuses, so the request bucket must not be charged either
+    assert buckets.acquire([user, tokens]) == pytest.approx(60 / (100 / 60))
+    assert buckets.acquire([(*user[:3], 9)]) == 0.0
+
+
+def test_memory_and_redis_agree(clock):
+    memory = MemoryBuckets(idle_seconds=3600)
+    redis = RedisBuckets(fakeredis.FakeRedis(), idle_seconds=3600)
+    script = [(0.0, 1), (0.1, 1), (0.1, 1), (0.5, 1), (0.0, 4), (1.7, 2), (0.0, 1), (10.0, 3), (0.2, 3)]
+    for step, cost in script:
+        clock.now += step
+        batch = [("rps:7", 2.0, 4, cost), ("plan:pro", 20.0, 5, 1)]
+        assert memory.acquire(batch) == pytest.approx(redis.acquire(batch))
+
+
+def test_check_limit_raises_429_with_retry_after(monkeypatch, clock, make_user):
+    monkeypatch.setattr(limiter_module, "limiter", RedisBuckets(fakeredis.FakeRedis(), idle_seconds=3600))
+    user = make_user(plan="free", credits=10)
+    for _ in range(3):
+        check_limit(user)
+    with pytest.raises(HTTPException) as exc:
+        check_limit(user)
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "2"
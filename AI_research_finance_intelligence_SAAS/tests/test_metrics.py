@@ -0,0 +1,62 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from backend.metrics import REQUEST_SECONDS, MetricsMiddleware
+
+
+def series(**labels):
+    key = tuple(sorted(labels.items()))
+    return REQUEST_SECONDS._series.get(key, [None, 0.0, 0])
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/stream")
+    async def stream():
+        async def events():
+            for i in range(3):
+                yield f"data: {i}\n\n"
+                await asyncio.sleep(0.1)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    return app
+
+
+def test_labels_use_the_route_template():
+    client = TestClient(make_app())
+    before = series(method="GET", route="/items/{item_id}", status=200)[2]
+    client.get("/items/1")
+    client.get("/items/2")
+    assert series(method="GET", route="/items/{item_id}", status=200)[2] == before + 2
+    client.get("/missing")
+    assert series(method="GET", route="unmatched", status=404)[2] >= 1
+
+
+def test_streamed_response_is_timed_to_the_last_chunk():
+    client = TestClient(make_app())
+    _, total_before, n_before = series(method="GET", route="/stream", status=200)
+    assert client.get("/stream").text.count("data:") == 3
+    _, total, n = series(method="GET", route="/stream", status=200)
+    assert n == n_before + 1
+    assert total - total_before >= 0.3
+
+
+def test_unhandled_errors_are_recorded_as_500():
+    client = TestClient(make_app(), raise_server_exceptions=False)
+    before = series(method="GET", route="/boom", status=500)[2]
+    assert client.get("/boom").status_code == 500
+    assert series(method="GET", route="/boom", status=500)[2] == before + 1
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from backend.auth import refresh
+from backend.auth.jwt import verify_token
+from backend.auth.refresh import DatabaseRevocations, RedisRevocations, issue_tokens, rotate
+from backend.database import SessionLocal
+from backend.models import UsedRefreshToken, User
+
+
+def add_user(email, is_active=True):
+    db = SessionLocal()
+    try:
+        db.add(User(email=email, password="x", is_active=is_active))
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.fixture(params=["db", "redis"])
+def stores(request):
+    # two stores stand in for two worker processes sharing one backend
+    if request.param == "db":
+        return DatabaseRevocations(), DatabaseRevocations()
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    return RedisRevocations(fakeredis.FakeRedis(server=server)), RedisRevocations(fakeredis.FakeRedis(server=server))
+
+
+def test_reuse_on_another_worker_revokes_the_family(stores):
+    first, second = stores
+    exp = time.time() + 3600
+    assert first.consume("a", "fam", exp)
+    assert not second.consume("a", "fam", exp)
+    # the family is dead everywhere, including tokens never used before
+    assert not first.consume("b", "fam", exp)
+    assert second.consume("c", "other", exp)
+
+
+def test_rotate_survives_a_restart(monkeypatch):
+    add_user("a@example.com")
+    monkeypatch.setattr(refresh, "revocations", DatabaseRevocations())
+    stolen = issue_tokens("a@example.com")["refresh_token"]
+    fresh = rotate(stolen)["refresh_token"]
+    assert verify_token(fresh)["fam"] == verify_token(stolen)["fam"]
+
+    monkeypatch.setattr(refresh, "revocations", DatabaseRevocations())
+    with pytest.raises(HTTPException):
+        rotate(stolen)
+    with pytest.raises(HTTPException):
+        rotate(fresh)
+
+
+def test_missing_or_inactive_users_cannot_renew(monkeypatch):
+    monkeypatch.setattr(refresh, "revocations", DatabaseRevocations())
+    add_user("off@example.com", is_active=False)
+    for email in ("off@example.com", "gone@example.com"):
+        with pytest.raises(HTTPException) as exc:
+            rotate(issue_tokens(email)["refresh_token"])
+        assert exc.value.status_code == 401
+
+
+def test_expired_rows_are_swept():
+    store = DatabaseRevocations(sweep_interval=0)
+    store.consume("old", "fam", time.time() - 60)
+    store.consume("new", "fam2", time.time() + 3600)
+    db = SessionLocal()
+    try:
+        assert [row.jti for row in db.query(UsedRefreshToken)] == ["new"]
+    finally:
+        db.close()
@@ -0,0 +1,148 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import HTTPException
+
+from backend.billing import stripe as billing
+from backend.billing.stripe import CircuitBreaker
+from backend.config import settings
+
+
+class StubStripe(BaseHTTPRequestHandler):
+    # answers every request with the next queued status
+    statuses = []
+    requests = 0
+    expires_at = None
+
+    def do_POST(self):
+        type(self).requests += 1
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status == 200:
+            body = {"id": f"cs_{self.requests}", "object": "checkout.session",
+                    "url": f"https://checkout.test/cs_{self.requests}", "expires_at": self.expires_at}
+        else:
+            body = {"error": {"type": "invalid_request_error" if status < 500 else "api_error", "message": "stub"}}
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Stripe-Should-Retry", "false")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubStripe)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(settings, "STRIPE_API_BASE", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(settings, "STRIPE_SECRET", "sk_test_stub")
+    monkeypatch.setattr(billing, "breaker", CircuitBreaker(failure_threshold=2, reset_timeout=30))
+    billing.client.cache_clear()
+    StubStripe.statuses, StubStripe.requests, StubStripe.expires_at = [], 0, None
+    billing._open_sessions.clear()
+    yield StubStripe
+    server.shutdown()
+    billing.client.cache_clear()
+    billing._open_sessions.clear()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(billing.time, "monotonic", lambda: now[0])
+    return now
+
+
+def checkout():
+    return billing.create_checkout("price_1", "https://ok", "https://cancel", 1)
+
+
+def test_outages_open_the_breaker(stub, clock):
+    stub.statuses = [500, 503]
+    for _ in range(2):
+        with pytest.raises(Exception) as exc:
+            checkout()
+        assert not isinstance(exc.value, HTTPException)
+    with pytest.raises(HTTPException) as exc:
+        checkout()
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "30"
+    assert stub.requests == 2
+
+
+def test_client_errors_do_not_count(stub):
+    stub.statuses = [400, 400, 400]
+    for _ in range(3):
+        with pytest.raises(Exception) as exc:
+            checkout()
+        assert getattr(exc.value, "http_status", None) == 400
+    assert billing.breaker.opened_at is None
+    assert checkout().url == "https://checkout.test/cs_4"
+
+
+def test_half_open_probe_rejected_with_4xx_closes_the_breaker(stub, clock):
+    stub.statuses = [500, 500, 400]
+    for _ in range(2):
+        with pytest.raises(Exception):
+            checkout()
+    clock[0] += 31
+    with pytest.raises(Exception) as exc:
+        checkout()
+    assert getattr(exc.value, "http_status", None) == 400
+    # Stripe is reachable again, so the next call goes straight through
+    assert checkout().url == "https://checkout.test/cs_4"
+    assert stub.requests == 4
+
+
+def test_half_open_probe_outage_reopens(stub, clock):
+    stub.statuses = [500, 500, 500]
+    for _ in range(2):
+        with pytest.raises(Exception):
+            checkout()
+    clock[0] += 31
+    with pytest.raises(Exception):
+        checkout()
+    with pytest.raises(HTTPException):
+        checkout()
+    assert stub.requests == 3
+
+
+@pytest.fixture
+def wall(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(billing.time, "time", lambda: now[0])
+    return now
+
+
+def checkout_url():
+    return billing.checkout_url("price_1", "https://ok", "https://cancel", 1)
+
+
+def test_checkout_url_reuses_an_open_session(stub, wall):
+    first = checkout_url()
+    wall[0] += settings.CHECKOUT_REUSE_SECONDS - 1
+    assert checkout_url() == first
+    assert stub.requests == 1
+
+    wall[0] += 2
+    assert checkout_url() != first
+    assert stub.requests == 2
+
+
+def test_checkout_url_does_not_reuse_an_expired_session(stub, wall):
+    stub.expires_at = int(wall[0]) + 10
+    first = checkout_url()
+    wall[0] += 5
+    assert checkout_url() == first
+
+    # Stripe's expiry comes before the reuse window ends
+    wall[0] += 6
+    assert checkout_url() != first
+    assert stub.requests == 2
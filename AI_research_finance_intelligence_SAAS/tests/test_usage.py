@@ -0,0 +1,61 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from backend.database import SessionLocal
+from backend.models import User
+from backend.usage.tracker import charge_credits, track_usage
+
+
+def balance(user_id):
+    db = SessionLocal()
+    try:
+        return db.get(User, user_id).credits
+    finally:
+        db.close()
+
+
+def test_parallel_charges_never_overdraw(make_user):
+    user = make_user(plan="free", credits=10)
+    start = threading.Barrier(40)
+
+    def charge(_):
+        start.wait()
+        db = SessionLocal()
+        try:
+            return charge_credits(db, user.id, 1)
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(40) as pool:
+        results = list(pool.map(charge, range(40)))
+
+    assert sum(r is not None for r in results) == 10
+    assert sorted(r for r in results if r is not None) == list(range(10))
+    assert balance(user.id) == 0
+
+
+def test_multi_token_charge_is_all_or_nothing(make_user):
+    user = make_user(plan="free", credits=5)
+    db = SessionLocal()
+    try:
+        assert charge_credits(db, user.id, 3) == 2
+        assert charge_credits(db, user.id, 3) is None
+    finally:
+        db.close()
+    assert balance(user.id) == 2
+
+
+def test_track_usage_raises_402_when_out_of_credits(make_user):
+    user = make_user(plan="free", credits=1)
+    assert track_usage(user) == 0
+    with pytest.raises(HTTPException) as exc:
+        track_usage(user)
+    assert exc.value.status_code == 402
+
+
+def test_paid_plans_are_not_capped(make_user):
+    user = make_user(plan="pro", credits=0)
+    assert track_usage(user, tokens=5) == -5
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from backend.database import SessionLocal
+from backend.models import UsageLog
+from backend.usage.logs import UsageLogWriter
+
+
+def logged():
+    db = SessionLocal()
+    try:
+        return db.query(UsageLog).count()
+    finally:
+        db.close()
+
+
+def wait_for(count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while logged() < count and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return logged()
+
+
+def test_flushes_once_batch_size_rows_are_pending(make_user):
+    user = make_user()
+    writer = UsageLogWriter(batch_size=5, interval=60)
+    for _ in range(4):
+        writer.add(user.id, "chat", 1)
+    time.sleep(0.2)
+    assert logged() == 0
+
+    writer.add(user.id, "chat", 1)
+    assert wait_for(5) == 5
+
+
+def test_flushes_on_interval_below_batch_size(make_user):
+    user = make_user()
+    writer = UsageLogWriter(batch_size=1000, interval=0.1)
+    for _ in range(3):
+        writer.add(user.id, "chat", 1)
+    assert wait_for(3) == 3
+
+
+def test_no_rows_lost_under_concurrent_adds(make_user):
+    user = make_user()
+    writer = UsageLogWriter(batch_size=7, interval=0.05)
+    start = threading.Barrier(8)
+
+    def add():
+        start.wait()
+        for _ in range(50):
+            writer.add(user.id, "chat", 1)
+
+    threads = [threading.Thread(target=add) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    writer.flush()
+    assert logged() == 400
+
+
+def test_pending_rows_are_written_at_interpreter_exit(make_user):
+    user = make_user()
+    # batch and interval far out of reach: only the atexit flush can write these
+    script = (
+        "from backend.usage.logs import usage_log\n"
+        f"for _ in range(25): usage_log.add({user.id}, 'chat', 1)\n"
+    )
+    env = dict(os.environ, USAGE_FLUSH_SIZE="1000", USAGE_FLUSH_INTERVAL="3600")
+    subprocess.run([sys.executable, "-c", script], cwd=Path(__file__).resolve().parents[1], env=env, check=True)
+    assert logged() == 25
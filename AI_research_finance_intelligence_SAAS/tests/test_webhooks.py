@@ -0,0 +1,88 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.billing import routes
+from backend.billing.webhooks import StripeInbox, sign_payload
+from backend.config import settings
+from backend.database import SessionLocal
+from backend.models import StripeEvent, User
+
+SECRET = "whsec_test"
+
+
+@pytest.fixture
+def deliver(monkeypatch):
+    monkeypatch.setattr(settings, "STRIPE_WEBHOOK_SECRET", SECRET)
+    monkeypatch.setattr(routes, "inbox", StripeInbox(batch_size=100, interval=1))
+    app = FastAPI()
+    app.include_router(routes.router)
+    client = TestClient(app)
+
+    def deliver(event):
+        payload = event if isinstance(event, bytes) else json.dumps(event).encode()
+        return client.post("/billing/webhook", content=payload,
+                           headers={"Stripe-Signature": sign_payload(payload, SECRET)})
+
+    deliver.client = client
+    deliver.inbox = routes.inbox
+    return deliver
+
+
+def checkout(event_id, user_id):
+    return {"id": event_id, "type": "checkout.session.completed",
+            "data": {"object": {"client_reference_id": str(user_id)}}}
+
+
+def account(user_id):
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        return user.plan, user.credits
+    finally:
+        db.close()
+
+
+def events():
+    db = SessionLocal()
+    try:
+        return {e.id: (e.processed_at is not None, e.error) for e in db.query(StripeEvent)}
+    finally:
+        db.close()
+
+
+def test_duplicate_delivery_is_applied_once(deliver, make_user):
+    user = make_user(plan="free", credits=10)
+    for _ in range(3):
+        assert deliver(checkout("evt_1", user.id)).status_code == 200
+    assert deliver.inbox.process_batch() == 1
+    assert deliver.inbox.process_batch() == 0
+    assert account(user.id) == ("pro", 10 + settings.PLAN_CREDITS["pro"])
+
+
+def test_poison_event_does_not_block_the_inbox(deliver, make_user):
+    user = make_user(plan="free", credits=0)
+    deliver({"id": "evt_bad", "type": "checkout.session.completed"})  # no data.object
+    deliver({"id": "evt_bad_user", "type": "checkout.session.completed",
+             "data": {"object": {"client_reference_id": "not-a-number"}}})
+    deliver(checkout("evt_good", user.id))
+
+    assert deliver.inbox.process_batch() == 3
+    assert account(user.id) == ("pro", settings.PLAN_CREDITS["pro"])
+    state = events()
+    assert state["evt_good"] == (True, None)
+    assert state["evt_bad"][0] and state["evt_bad"][1].startswith("KeyError")
+    assert state["evt_bad_user"][0] and state["evt_bad_user"][1].startswith("ValueError")
+    # nothing is left to re-claim on the next pass
+    assert deliver.inbox.process_batch() == 0
+
+
+def test_bad_signature_and_missing_id_are_rejected(deliver):
+    payload = json.dumps(checkout("evt_1", 1)).encode()
+    forged = deliver.client.post("/billing/webhook", content=payload,
+                                 headers={"Stripe-Signature": sign_payload(payload, "whsec_other")})
+    assert forged.status_code == 400
+    assert deliver(b'{"type": "ping"}').status_code == 400
+    assert events() == {}
@@ -0,0 +1,198 @@
+"""Incremental on-disk store of daily OHLCV bars.
+
+Each ticker is one ``.npy`` file holding a structured array sorted by bar
+timestamp. Updates only request bars from the second-to-last stored day
+onward: the last day is re-fetched because it may have been a partial,
+intraday bar, and the settled day before it is compared with what is stored.
+Bars are split- and dividend-adjusted, so a settled close that moved means the
+whole history was re-adjusted and is downloaded again. Reads are served from a
+memory-mapped view, so agents and sessions share one history cache instead of
+pulling 5000 bars per call.
+
+``python bar_store.py`` times a cold full download against a warm incremental
+update, on a synthetic Polygon feed or, with ``--live TICKER`` and
+``POLYGON_API_KEY`` set, against Polygon itself.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+ROOT = os.getenv("BAR_STORE_DIR", os.path.expanduser("~/.cache/finance_terminal/bars"))
+HISTORY_START = "2020-01-01"
+
+BAR_DTYPE = np.dtype([
+    ("t", "<i8"),
+    ("o", "<f8"),
+    ("h", "<f8"),
+    ("l", "<f8"),
+    ("c", "<f8"),
+    ("v", "<f8"),
+])
+
+
+class BarStore:
+    def __init__(self, root=ROOT):
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, ticker):
+        return os.path.join(self.root, f"{ticker.upper()}.npy")
+
+    def load(self, ticker):
+        try:
+            return np.load(self.path(ticker), mmap_mode="r")
+        except (OSError, ValueError):
+            return np.empty(0, dtype=BAR_DTYPE)
+
+    def last_timestamp(self, ticker):
+        bars = self.load(ticker)
+        return int(bars["t"][-1]) if len(bars) else None
+
+    def update(self, client, ticker):
+        """Fetch bars newer than the stored history and return the full series."""
+        ticker = ticker.upper()
+        today = date.today().strftime("%Y-%m-%d")
+        with self._lock(ticker):
+            bars = self.load(ticker)
+            if not len(bars):
+                return self._replace(ticker, self._fetch(client, ticker, HISTORY_START, today))
+            settled = bars[-2] if len(bars) > 1 else bars[-1]
+            start = datetime.fromtimestamp(settled["t"] / 1000).strftime("%Y-%m-%d")
+            new = self._fetch(client, ticker, start, today)
+            if not len(new):
+                return bars
+            if self._readjusted(settled, new):
+                # a split or dividend rescaled the history: stored and new bars no longer match
+                return self._replace(ticker, self._fetch(client, ticker, HISTORY_START, today, use_cache=False))
+            keep = bars[bars["t"] < new["t"][0]]
+            return self._replace(ticker, np.concatenate([np.asarray(keep), new]))
+
+    def get_range(self, ticker, start_ms=None, end_ms=None):
+        bars = self.load(ticker)
+        lo = np.searchsorted(bars["t"], start_ms, "left") if start_ms is not None else 0
+        hi = np.searchsorted(bars["t"], end_ms, "right") if end_ms is not None else len(bars)
+        return bars[lo:hi]
+
+    @staticmethod
+    def _readjusted(settled, new):
+        same = new[new["t"] == settled["t"]]
+        return bool(len(same)) and not np.isclose(same["c"][0], settled["c"], rtol=1e-6)
+
+    def _fetch(self, client, ticker, start, end, use_cache=True):
+        path = f"/v2/aggs/ticker/{ticker}/range/1/day/{start}/{end}"
+        params = {"adjusted": "true", "sort": "asc", "limit": 50000}
+        data = client.get_json(path, params) if use_cache else client.get_json(path, params, use_cache=False)
+        rows = list(data.get("results") or [])
+        while data.get("next_url"):
+            data = client.get_json(data["next_url"])
+            rows.extend(data.get("results") or [])
+
+        out = np.empty(len(rows), dtype=BAR_DTYPE)
+        for name in BAR_DTYPE.names:
+            out[name] = [r.get(name, 0) for r in rows]
+        return out
+
+    def _replace(self, ticker, bars):
+        if not len(bars):
+            return self.load(ticker)
+        self._write(ticker, bars)
+        return self.load(ticker)
+
+    def _write(self, ticker, bars):
+        path = self.path(ticker)
+        tmp = f"{path[:-4]}.{threading.get_ident()}.tmp.npy"
+        np.save(tmp, bars)
+        os.replace(tmp, path)
+
+    def _lock(self, ticker):
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+
+store = BarStore()
+
+
+# ----------------------------------------------------------------------
+# Benchmark
+# ----------------------------------------------------------------------
+
+class SyntheticPolygon:
+    """Serves a random-walk daily history through ``get_json`` as JSON text,
+    so the benchmark pays the same encode/decode cost per bar as a real call."""
+
+    def __init__(self, bars=1700, seed=0):
+        rng = np.random.default_rng(seed)
+        day = 86_400_000
+        self.t = int(datetime(2020, 1, 2).timestamp() * 1000) + day * np.arange(bars)
+        self.c = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+        self.v = rng.integers(1e5, 1e7, bars).astype(float)
+        self.requests = self.bars_sent = 0
+
+    def get_json(self, path, params=None, use_cache=True):
+        start, end = path.rsplit("/", 2)[-2:]
+        lo = np.searchsorted(self.t, datetime.strptime(start, "%Y-%m-%d").timestamp() * 1000)
+        hi = np.searchsorted(self.t, (datetime.strptime(end, "%Y-%m-%d").timestamp() + 86_400) * 1000)
+        rows = [{"t": int(t), "o": c, "h": c * 1.01, "l": c * 0.99, "c": c, "v": v}
+                for t, c, v in zip(self.t[lo:hi], self.c[lo:hi].tolist(), self.v[lo:hi].tolist())]
+        self.requests += 1
+        self.bars_sent += len(rows)
+        return json.loads(json.dumps({"results": rows}))
+
+
+def benchmark(client=None, ticker="BENCH", repeats=20):
+    """Cold full download vs warm incremental update vs a range read, in a scratch store."""
+    client = client or SyntheticPolygon()
+    with tempfile.TemporaryDirectory() as root:
+        bars = BarStore(root)
+        sent = getattr(client, "bars_sent", 0)
+        started = time.perf_counter()
+        history = bars.update(client, ticker)
+        cold = time.perf_counter() - started
+        cold_bars = getattr(client, "bars_sent", 0) - sent
+
+        sent = getattr(client, "bars_sent", 0)
+        started = time.perf_counter()
+        for _ in range(repeats):
+            bars.update(client, ticker)
+        warm = (time.perf_counter() - started) / repeats
+        warm_bars = (getattr(client, "bars_sent", 0) - sent) / repeats
+
+        started = time.perf_counter()
+        for _ in range(repeats):
+            np.asarray(bars.get_range(ticker, int(history["t"][-252])))
+        read = (time.perf_counter() - started) / repeats
+    return {"bars": len(history), "cold_seconds": cold, "cold_bars": cold_bars,
+            "warm_seconds": warm, "warm_bars": warm_bars, "range_seconds": read}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold vs incremental bar downloads")
+    parser.add_argument("--live", metavar="TICKER", help="use Polygon (needs POLYGON_API_KEY)")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.live:
+        from polygon_client import PolygonClient
+
+        # no response cache, so the warm runs really hit Polygon
+        result = benchmark(PolygonClient(os.environ["POLYGON_API_KEY"], cache=None), args.live.upper(), args.repeats)
+    else:
+        result = benchmark(repeats=args.repeats)
+    print(f"{result['bars']} bars: cold full fetch {result['cold_seconds'] * 1000:.1f} ms"
+          + (f" ({result['cold_bars']} bars sent)" if result["cold_bars"] else ""))
+    print(f"warm incremental update {result['warm_seconds'] * 1000:.2f} ms"
+          + (f" ({result['warm_bars']:.0f} bars sent)" if result["warm_bars"] else ""))
+    print(f"last-year range read {result['range_seconds'] * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
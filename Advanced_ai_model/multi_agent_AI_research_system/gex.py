@@ -0,0 +1,111 @@
+"""Gamma exposure (GEX) and dealer-positioning estimates from an options chain.
+
+Uses the common convention that dealers are long calls and short puts against
+customer flow: call gamma counts positive, put gamma negative. Exposure is in
+dollars of delta change per 1% move of the underlying.
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from options_analytics import CONTRACT_SIZE, combine
+
+RISK_FREE_RATE = 0.04
+# 0DTE contracts still carry a few hours of time value
+MIN_YEARS = 0.5 / 365
+
+
+def bs_gamma(spot, strike, iv, years, rate=RISK_FREE_RATE):
+    """Black-Scholes gamma; all arguments broadcast against each other."""
+    vol_t = iv * np.sqrt(years)
+    d1 = (np.log(spot / strike) + (rate + 0.5 * iv ** 2) * years) / vol_t
+    return np.exp(-0.5 * d1 ** 2) / (np.sqrt(2 * np.pi) * spot * vol_t)
+
+
+def dollar_gex(gamma, open_interest, sign, spot):
+    return gamma * open_interest * sign * CONTRACT_SIZE * spot ** 2 * 0.01
+
+
+def _contracts(calls, puts, today):
+    chain = combine(calls, puts)
+    if chain.empty or "Implied Volatility" not in chain:
+        return None
+    chain = chain.assign(**{"Implied Volatility": pd.to_numeric(chain["Implied Volatility"], errors="coerce")})
+    chain = chain[(chain["Open Interest"] > 0) & (chain["Implied Volatility"] > 0)]
+    if chain.empty:
+        return None
+    days = (pd.to_datetime(chain["Expiration"]) - pd.Timestamp(today)).dt.days.to_numpy(dtype=float)
+    return {
+        "strike": chain["Strike"].to_numpy(dtype=float),
+        "iv": chain["Implied Volatility"].to_numpy(dtype=float),
+        "oi": chain["Open Interest"].to_numpy(dtype=float),
+        "sign": np.where(chain["Type"].to_numpy() == "call", 1.0, -1.0),
+        "years": np.maximum(days / 365, MIN_YEARS),
+        "type": chain["Type"].to_numpy(),
+    }
+
+
+def zero_gamma_level(c, spot, grid_pct=0.2, grid_points=121):
+    """Spot price where total dealer gamma flips sign, re-pricing gamma on a spot grid."""
+    grid = spot * np.linspace(1 - grid_pct, 1 + grid_pct, grid_points)
+    gamma = bs_gamma(grid[:, None], c["strike"], c["iv"], c["years"])
+    profile = dollar_gex(gamma, c["oi"], c["sign"], grid[:, None]).sum(axis=1)
+    crossings = np.nonzero(np.diff(np.sign(profile)))[0]
+    if not len(crossings):
+        return None
+    i = crossings[np.argmin(np.abs(grid[crossings] - spot))]
+    x0, x1, y0, y1 = grid[i], grid[i + 1], profile[i], profile[i + 1]
+    return float(x0 - y0 * (x1 - x0) / (y1 - y0))
+
+
+def gamma_exposure(calls, puts, spot, today=None):
+    """Per-strike and total GEX, zero-gamma flip and call/put walls.
+
+    Returns None without a numeric spot or when no contract has both open
+    interest and IV.
+    """
+    if not isinstance(spot, (int, float)) or spot <= 0:
+        return None
+    c = _contracts(calls, puts, today or date.today())
+    if c is None:
+        return None
+
+    gex = dollar_gex(bs_gamma(spot, c["strike"], c["iv"], c["years"]), c["oi"], c["sign"], spot)
+    strikes, idx = np.unique(c["strike"], return_inverse=True)
+    is_call = c["type"] == "call"
+    call_gex = np.bincount(idx, weights=np.where(is_call, gex, 0), minlength=len(strikes))
+    put_gex = np.bincount(idx, weights=np.where(is_call, 0, gex), minlength=len(strikes))
+    net = call_gex + put_gex
+    total = float(net.sum())
+
+    return {
+        "spot": float(spot),
+        "total_gex": total,
+        "regime": "positive (dealers dampen moves)" if total >= 0 else "negative (dealers amplify moves)",
+        "zero_gamma": zero_gamma_level(c, spot),
+        "call_wall": float(strikes[np.argmax(call_gex)]),
+        "put_wall": float(strikes[np.argmin(put_gex)]),
+        "strikes": strikes,
+        "call_gex": call_gex,
+        "put_gex": put_gex,
+        "net_gex": net,
+    }
+
+
+def summarize(result, top=8):
+    """Compact, JSON-friendly view of ``gamma_exposure`` for the agents."""
+    order = np.argsort(-np.abs(result["net_gex"]))[:top]
+    return {
+        "spot": round(result["spot"], 2),
+        "total_gex_usd_per_1pct": round(result["total_gex"]),
+        "regime": result["regime"],
+        "zero_gamma_flip": round(result["zero_gamma"], 2) if result["zero_gamma"] else None,
+        "call_wall": result["call_wall"],
+        "put_wall": result["put_wall"],
+        "largest_strikes": [
+            {"strike": float(result["strikes"][i]), "net_gex": round(float(result["net_gex"][i]))}
+            for i in sorted(order, key=lambda i: result["strikes"][i])
+        ],
+    }
@@ -0,0 +1,386 @@
+"""Technical indicators on NumPy arrays: SMA, EMA, Wilder RSI, MACD, Bollinger, ATR, VWAP.
+
+Batch functions take arrays with time on the last axis, so one call covers a
+single series or a (tickers x bars) matrix. Rolling-window indicators use
+cumulative sums; recursive ones (EMA, RSI, MACD, ATR) step along time with
+every ticker updated at once. The same recursions are available as state
+objects (``EMA``, ``RSI``, ``MACD``, ``ATR``, ``Rolling``, ``IndicatorState``)
+that absorb one new bar in O(1) instead of recomputing the history.
+
+Warm-up follows the usual conventions: EMA-type averages are seeded with the
+simple mean of their first ``n`` values, and values are NaN until then.
+"""
+
+import time
+
+import numpy as np
+
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+MACD_PERIODS = (12, 26, 9)
+BOLLINGER = (20, 2.0)
+VWAP_PERIOD = 20
+
+
+def _out(value):
+    return value if value.ndim else float(value)
+
+
+# ------------------------------------------------------------------
+# Incremental state
+# ------------------------------------------------------------------
+
+class EMA:
+    """Exponential average updated one value at a time; ``alpha=1/n`` gives Wilder smoothing.
+
+    NaN inputs are skipped (the average carries over), so tickers with a
+    shorter history can share one state array.
+    """
+
+    def __init__(self, n, shape=(), alpha=None):
+        self.n = n
+        self.alpha = 2 / (n + 1) if alpha is None else alpha
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.avg = np.zeros(shape)
+
+    def update(self, x):
+        x = np.asarray(x, dtype=float)
+        valid = ~np.isnan(x)
+        seeding = valid & (self.count < self.n)
+        if seeding.any():
+            self.avg = np.where(seeding, self.avg + (x - self.avg) / (self.count + 1), self.avg)
+            self.count = self.count + seeding
+            valid = valid & ~seeding
+        self.avg = np.where(valid, self.avg + self.alpha * (x - self.avg), self.avg)
+        return _out(np.where(self.count >= self.n, self.avg, np.nan))
+
+
+class Rolling:
+    """Sum and sum of squares over the last ``n`` values, kept in a ring buffer."""
+
+    def __init__(self, n, shape=()):
+        self.n = n
+        self.buf = np.full(tuple(shape) + (n,), np.nan)
+        self.pos = 0
+        self.sum = np.zeros(shape)
+        self.sumsq = np.zeros(shape)
+        self.count = np.zeros(shape, dtype=np.int64)
+
+    def update(self, x):
+        x = np.asarray(x, dtype=float)
+        old = self.buf[..., self.pos]
+        old_valid, valid = ~np.isnan(old), ~np.isnan(x)
+        old0, x0 = np.where(old_valid, old, 0.0), np.where(valid, x, 0.0)
+        self.sum = self.sum - old0 + x0
+        self.sumsq = self.sumsq - old0 ** 2 + x0 ** 2
+        self.count = self.count - old_valid + valid
+        self.buf[..., self.pos] = x
+        self.pos = (self.pos + 1) % self.n
+        return self
+
+    @property
+    def full(self):
+        return self.count == self.n
+
+    def mean(self):
+        return _out(np.where(self.full, self.sum / self.n, np.nan))
+
+    def std(self):
+        mean = self.sum / self.n
+        var = np.maximum(self.sumsq / self.n - mean ** 2, 0)
+        return _out(np.where(self.full, np.sqrt(var), np.nan))
+
+
+class RSI:
+    def __init__(self, n=RSI_PERIOD, shape=()):
+        self.prev = np.full(shape, np.nan)
+        self.gain = EMA(n, shape, alpha=1 / n)
+        self.loss = EMA(n, shape, alpha=1 / n)
+
+    def update(self, close):
+        close = np.asarray(close, dtype=float)
+        delta = close - self.prev
+        self.prev = np.where(np.isnan(close), self.prev, close)
+        gain = self.gain.update(np.where(np.isnan(delta), np.nan, np.maximum(delta, 0)))
+        loss = self.loss.update(np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0)))
+        return _out(_rsi(np.asarray(gain), np.asarray(loss)))
+
+
+class MACD:
+    def __init__(self, fast=MACD_PERIODS[0], slow=MACD_PERIODS[1], signal=MACD_PERIODS[2], shape=()):
+        self.fast = EMA(fast, shape)
+        self.slow = EMA(slow, shape)
+        self.signal = EMA(signal, shape)
+
+    def update(self, close):
+        line = np.asarray(self.fast.update(close)) - np.asarray(self.slow.update(close))
+        signal = np.asarray(self.signal.update(line))
+        return _out(line), _out(signal), _out(line - signal)
+
+
+class ATR:
+    def __init__(self, n=ATR_PERIOD, shape=()):
+        self.prev_close = np.full(shape, np.nan)
+        self.avg = EMA(n, shape, alpha=1 / n)
+
+    def update(self, high, low, close):
+        tr = _true_range(np.asarray(high, dtype=float), np.asarray(low, dtype=float), self.prev_close)
+        close = np.asarray(close, dtype=float)
+        self.prev_close = np.where(np.isnan(close), self.prev_close, close)
+        return self.avg.update(tr)
+
+
+class IndicatorState:
+    """Every indicator of ``compute`` for the latest bar, one bar at a time.
+
+    ``shape`` is the shape of one bar's values: ``()`` for a single ticker or
+    ``(n_tickers,)`` for a universe updated in lockstep.
+    """
+
+    def __init__(self, shape=()):
+        self.sma50 = Rolling(50, shape)
+        self.sma200 = Rolling(200, shape)
+        self.ema20 = EMA(20, shape)
+        self.rsi = RSI(shape=shape)
+        self.macd = MACD(shape=shape)
+        self.bollinger = Rolling(BOLLINGER[0], shape)
+        self.atr = ATR(shape=shape)
+        self.pv = Rolling(VWAP_PERIOD, shape)
+        self.volume = Rolling(VWAP_PERIOD, shape)
+
+    @classmethod
+    def from_history(cls, high, low, close, volume):
+        """Warm a state up on past bars (time on the last axis)."""
+        state = cls(np.shape(close)[:-1])
+        for t in range(np.shape(close)[-1]):
+            state.update(high[..., t], low[..., t], close[..., t], volume[..., t])
+        return state
+
+    def update(self, high, low, close, volume):
+        high, low, close, volume = (np.asarray(a, dtype=float) for a in (high, low, close, volume))
+        macd, signal, hist = self.macd.update(close)
+        mid = self.bollinger.update(close).mean()
+        width = BOLLINGER[1] * np.asarray(self.bollinger.std())
+        self.pv.update((high + low + close) / 3 * volume)
+        self.volume.update(volume)
+        return {
+            "close": _out(close),
+            "sma50": self.sma50.update(close).mean(),
+            "sma200": self.sma200.update(close).mean(),
+            "ema20": self.ema20.update(close),
+            "rsi": self.rsi.update(close),
+            "macd": macd,
+            "macd_signal": signal,
+            "macd_hist": hist,
+            "bb_mid": mid,
+            "bb_upper": _out(mid + width),
+            "bb_lower": _out(mid - width),
+            "atr": self.atr.update(high, low, close),
+            "vwap20": _out(np.where(self.volume.full & (self.volume.sum > 0),
+                                    self.pv.sum / np.where(self.volume.sum > 0, self.volume.sum, 1), np.nan)),
+        }
+
+
+# ------------------------------------------------------------------
+# Batch functions (time on the last axis)
+# ------------------------------------------------------------------
+
+def _rsi(gain, loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(loss == 0, np.where(gain == 0, 50.0, 100.0), 100 - 100 / (1 + gain / loss))
+
+
+def _true_range(high, low, prev_close):
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def _shift(x, fill=np.nan):
+    out = np.empty_like(x)
+    out[..., 0] = fill
+    out[..., 1:] = x[..., :-1]
+    return out
+
+
+def _recursive(state, x):
+    # step over a time-major copy so each update reads contiguous memory
+    steps = np.ascontiguousarray(np.moveaxis(x, -1, 0))
+    out = np.empty(steps.shape)
+    for t in range(len(steps)):
+        out[t] = state.update(steps[t])
+    return np.moveaxis(out, 0, -1)
+
+
+def _window_sums(x, n):
+    """Rolling sums of x and x**2 and the count of non-NaN values; NaN-aligned to ``x``."""
+    valid = ~np.isnan(x)
+    x0 = np.where(valid, x, 0.0)
+    pad = [(0, 0)] * (x.ndim - 1) + [(1, 0)]
+    sums = []
+    for values in (x0, x0 ** 2, valid.astype(np.int64)):
+        cs = np.pad(np.cumsum(values, axis=-1), pad)
+        sums.append(cs[..., n:] - cs[..., :-n])
+    return sums
+
+
+def _align(values, n, shape):
+    out = np.full(shape, np.nan)
+    out[..., n - 1:] = values
+    return out
+
+
+def sma(close, n):
+    close = np.asarray(close, dtype=float)
+    if close.shape[-1] < n:
+        return np.full(close.shape, np.nan)
+    total, _, count = _window_sums(close, n)
+    return _align(np.where(count == n, total / n, np.nan), n, close.shape)
+
+
+def ema(close, n, alpha=None):
+    close = np.asarray(close, dtype=float)
+    return _recursive(EMA(n, close.shape[:-1], alpha), close)
+
+
+def rsi(close, n=RSI_PERIOD):
+    """Wilder's RSI: average gain/loss seeded with a simple mean, then smoothed with alpha = 1/n."""
+    close = np.asarray(close, dtype=float)
+    delta = np.diff(close, axis=-1, prepend=np.nan)
+    gain = ema(np.where(np.isnan(delta), np.nan, np.maximum(delta, 0)), n, alpha=1 / n)
+    loss = ema(np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0)), n, alpha=1 / n)
+    return _rsi(gain, loss)
+
+
+def macd(close, fast=MACD_PERIODS[0], slow=MACD_PERIODS[1], signal=MACD_PERIODS[2]):
+    """(macd line, signal line, histogram)."""
+    line = ema(close, fast) - ema(close, slow)
+    sig = ema(line, signal)
+    return line, sig, line - sig
+
+
+def bollinger(close, n=BOLLINGER[0], k=BOLLINGER[1]):
+    """(upper, middle, lower) bands with a population standard deviation."""
+    close = np.asarray(close, dtype=float)
+    if close.shape[-1] < n:
+        nan = np.full(close.shape, np.nan)
+        return nan, nan, nan
+    total, total_sq, count = _window_sums(close, n)
+    mean = total / n
+    std = np.sqrt(np.maximum(total_sq / n - mean ** 2, 0))
+    full = count == n
+    mid = _align(np.where(full, mean, np.nan), n, close.shape)
+    width = _align(np.where(full, k * std, np.nan), n, close.shape)
+    return mid + width, mid, mid - width
+
+
+def atr(high, low, close, n=ATR_PERIOD):
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    return ema(_true_range(high, low, _shift(close)), n, alpha=1 / n)
+
+
+def vwap(high, low, close, volume, n=VWAP_PERIOD):
+    """Volume-weighted typical price over the last ``n`` bars; ``n=None`` anchors it at the first bar."""
+    high, low, close, volume = (np.asarray(a, dtype=float) for a in (high, low, close, volume))
+    pv = np.nan_to_num((high + low + close) / 3 * volume)
+    volume = np.nan_to_num(volume)
+    if n is None:
+        pv_sum, vol_sum = np.cumsum(pv, axis=-1), np.cumsum(volume, axis=-1)
+    else:
+        if close.shape[-1] < n:
+            return np.full(close.shape, np.nan)
+        pv_sum = _align(_window_sums(pv, n)[0], n, close.shape)
+        vol_sum = _align(_window_sums(volume, n)[0], n, close.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(vol_sum > 0, pv_sum / vol_sum, np.nan)
+
+
+def compute(high, low, close, volume):
+    """All indicators for every bar; keys match ``IndicatorState.update``."""
+    close = np.asarray(close, dtype=float)
+    line, signal, hist = macd(close)
+    upper, mid, lower = bollinger(close)
+    return {
+        "close": close,
+        "sma50": sma(close, 50),
+        "sma200": sma(close, 200),
+        "ema20": ema(close, 20),
+        "rsi": rsi(close),
+        "macd": line,
+        "macd_signal": signal,
+        "macd_hist": hist,
+        "bb_mid": mid,
+        "bb_upper": upper,
+        "bb_lower": lower,
+        "atr": atr(high, low, close),
+        "vwap20": vwap(high, low, close, volume),
+    }
+
+
+def _round(value, digits=2):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+def summarize(high, low, close, volume):
+    """Compact reading of the latest bar for one ticker, for the agents."""
+    ind = compute(high, low, close, volume)
+    last = {name: values[-1] for name, values in ind.items()}
+    price = last["close"]
+    prev_hist = ind["macd_hist"][-2] if len(close) > 1 else np.nan
+
+    trend = None
+    if not np.isnan(last["sma200"]):
+        trend = "above 200-day SMA" if price > last["sma200"] else "below 200-day SMA"
+    rsi_zone = None
+    if not np.isnan(last["rsi"]):
+        rsi_zone = "overbought" if last["rsi"] >= 70 else "oversold" if last["rsi"] <= 30 else "neutral"
+    macd_cross = None
+    if not np.isnan(prev_hist) and not np.isnan(last["macd_hist"]):
+        if prev_hist <= 0 < last["macd_hist"]:
+            macd_cross = "bullish cross"
+        elif prev_hist >= 0 > last["macd_hist"]:
+            macd_cross = "bearish cross"
+    band = last["bb_upper"] - last["bb_lower"]
+
+    return {
+        "close": _round(price),
+        "sma50": _round(last["sma50"]),
+        "sma200": _round(last["sma200"]),
+        "trend": trend,
+        "ema20": _round(last["ema20"]),
+        "rsi14": _round(last["rsi"], 1),
+        "rsi_zone": rsi_zone,
+        "macd": _round(last["macd"], 3),
+        "macd_signal": _round(last["macd_signal"], 3),
+        "macd_hist": _round(last["macd_hist"], 3),
+        "macd_cross": macd_cross,
+        "bollinger_pct_b": _round((price - last["bb_lower"]) / band if band > 0 else np.nan),
+        "bollinger_width_pct": _round(band / last["bb_mid"] * 100 if last["bb_mid"] else np.nan),
+        "atr14": _round(last["atr"]),
+        "atr_pct": _round(last["atr"] / price * 100 if price else np.nan),
+        "vs_vwap20_pct": _round((price / last["vwap20"] - 1) * 100 if last["vwap20"] else np.nan),
+    }
+
+
+def benchmark(tickers=1000, bars=1260, seed=0):
+    """Time ``compute`` over a (tickers x bars) random-walk universe and one incremental update."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (tickers, bars)), axis=-1))
+    spread = np.abs(rng.normal(0, 0.01, (tickers, bars))) * close
+    high, low = close + spread, close - spread
+    volume = rng.integers(1e5, 1e7, (tickers, bars)).astype(float)
+
+    start = time.perf_counter()
+    compute(high, low, close, volume)
+    batch = time.perf_counter() - start
+
+    state = IndicatorState.from_history(high[:, :-1], low[:, :-1], close[:, :-1], volume[:, :-1])
+    start = time.perf_counter()
+    state.update(high[:, -1], low[:, -1], close[:, -1], volume[:, -1])
+    step = time.perf_counter() - start
+    return {"tickers": tickers, "bars": bars, "batch_seconds": batch, "update_seconds": step}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"{result['tickers']} tickers x {result['bars']} bars: "
+          f"full history {result['batch_seconds'] * 1000:.0f} ms, "
+          f"one new bar {result['update_seconds'] * 1000:.2f} ms")
@@ -0,0 +1,268 @@
+"""Persistent knowledge-base ingestion for uploaded PDFs.
+
+Documents are keyed by the SHA-256 of their bytes, so a file that was already
+ingested (by any session, before any restart) is skipped without parsing or
+embedding it again. A new document is staged to disk once and split into page
+batches that a process pool extracts and chunks on every core (workers get the
+file path, not the bytes); chunks are embedded in batched, concurrent OpenAI
+calls. Each document is stored as its own ``.npy`` vector
+file plus a ``.jsonl`` of chunk metadata under ``KB_DIR`` and only then added
+to the manifest, so the index grows incrementally and a crash never leaves a
+half-written entry behind.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import lru_cache
+from importlib.machinery import ModuleSpec
+
+import numpy as np
+
+ROOT = os.getenv("KB_DIR", os.path.expanduser("~/.cache/finance_terminal/kb"))
+EMBED_MODEL = os.getenv("KB_EMBED_MODEL", "text-embedding-3-small")
+EMBED_BATCH = 256
+EMBED_CONCURRENCY = 4
+PAGES_PER_TASK = 8
+CHUNK_CHARS = 1500
+CHUNK_OVERLAP = 200
+
+
+def chunk_text(text, size=CHUNK_CHARS, overlap=CHUNK_OVERLAP):
+    """Whitespace-normalised chunks of about ``size`` characters, cut at word boundaries."""
+    text = " ".join(text.split())
+    chunks, start = [], 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            cut = text.rfind(" ", start + size // 2, end)
+            end = cut if cut > start else end
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        space = text.find(" ", max(start + 1, end - overlap), end)
+        start = space + 1 if space != -1 else end
+    return chunks
+
+
+def _extract(path, first, last):
+    """Worker: ``[(page_number, chunk), ...]`` for pages ``first..last-1`` of the PDF at ``path``."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    out = []
+    for number in range(first, last):
+        text = reader.pages[number].extract_text() or ""
+        out.extend((number + 1, chunk) for chunk in chunk_text(text))
+    return out
+
+
+def page_count(path):
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+@lru_cache(maxsize=1)
+def _openai():
+    from openai import OpenAI
+
+    return OpenAI()
+
+
+def openai_embed(texts, model=EMBED_MODEL):
+    response = _openai().embeddings.create(model=model, input=list(texts))
+    return np.array([d.embedding for d in response.data], dtype=np.float32)
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Streamlit runs script threads and the quote-stream thread; forking
+            # from there can copy a held lock into a worker and hang it
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=context)
+        return _pool
+
+
+@contextmanager
+def _workers_skip_main():
+    """Hold while submitting: workers may be started on demand by any submit.
+
+    Spawned and forkserver workers re-run the parent's ``__main__`` from its
+    file unless its spec is named ``__main__``; under Streamlit that file is
+    the whole dashboard. ``_extract`` lives in this module, so workers never
+    need it.
+    """
+    with _pool_lock:
+        main = sys.modules["__main__"]
+        if getattr(main, "__spec__", None) is not None:
+            yield
+            return
+        main.__spec__ = ModuleSpec("__main__", None)
+        try:
+            yield
+        finally:
+            main.__spec__ = None
+
+
+class KnowledgeIndex:
+    def __init__(self, root=ROOT, embed=openai_embed, model=EMBED_MODEL):
+        self.root = root
+        self.embed = embed
+        self.model = model
+        self._lock = threading.Lock()
+        self._doc_locks = {}
+        self._matrix = None
+        self._chunks = None
+        os.makedirs(root, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    @staticmethod
+    def digest(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def has(self, digest):
+        return digest in self.manifest
+
+    def documents(self):
+        return [{"sha256": digest, **entry} for digest, entry in self.manifest.items()]
+
+    def ingest(self, name, data, progress=None):
+        """Add one PDF; returns ``{"status": "duplicate" | "added" | "empty", ...}``.
+
+        ``progress(fraction, message)`` is called as extraction and embedding advance.
+        """
+        progress = progress or (lambda fraction, message: None)
+        digest = self.digest(data)
+        with self._doc_lock(digest):
+            if self.has(digest):
+                progress(1.0, f"{name}: already indexed")
+                return {"status": "duplicate", "sha256": digest, **self.manifest[digest]}
+
+            started = time.time()
+            staged = self._stage(digest, data)
+            try:
+                pages = page_count(staged)
+                chunks = self._extract(staged, pages, lambda done: progress(0.5 * done, f"{name}: extracting pages"))
+            finally:
+                os.remove(staged)
+            if not chunks:
+                progress(1.0, f"{name}: no extractable text")
+                return {"status": "empty", "sha256": digest, "pages": pages, "chunks": 0}
+            vectors = self._embed([text for _, text in chunks],
+                                  lambda done: progress(0.5 + 0.5 * done, f"{name}: embedding chunks"))
+
+            self._write_doc(digest, vectors, chunks)
+            entry = {"name": name, "pages": pages, "chunks": len(chunks), "model": self.model,
+                     "added": time.strftime("%Y-%m-%dT%H:%M:%S"), "seconds": round(time.time() - started, 1)}
+            with self._lock:
+                self.manifest[digest] = entry
+                self._write_manifest()
+                self._matrix = self._chunks = None
+            progress(1.0, f"{name}: indexed {len(chunks)} chunks from {pages} pages")
+            return {"status": "added", "sha256": digest, **entry}
+
+    def search(self, query, top=5):
+        """Top chunks by cosine similarity: ``[{"document", "page", "score", "text"}, ...]``."""
+        matrix, chunks = self._load()
+        if not len(chunks):
+            return []
+        q = _normalize(self.embed([query], model=self.model))[0]
+        scores = matrix @ q
+        top = min(top, len(scores))
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        return [{**chunks[i], "score": round(float(scores[i]), 3)} for i in best]
+
+    def _stage(self, digest, data):
+        path = self._path(digest, f".{threading.get_ident()}.pdf")
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def _extract(self, path, pages, progress):
+        ranges = [(first, min(first + PAGES_PER_TASK, pages)) for first in range(0, pages, PAGES_PER_TASK)]
+        results = {}
+        pool = process_pool()
+        with _workers_skip_main():
+            futures = {pool.submit(_extract, path, first, last): first for first, last in ranges}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            progress(done / len(ranges))
+        return [chunk for first, _ in ranges for chunk in results[first]]
+
+    def _embed(self, texts, progress):
+        batches = [texts[i:i + EMBED_BATCH] for i in range(0, len(texts), EMBED_BATCH)]
+        out = [None] * len(batches)
+        with ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY) as executor:
+            futures = {executor.submit(self.embed, batch, model=self.model): i for i, batch in enumerate(batches)}
+            for done, future in enumerate(as_completed(futures), 1):
+                out[futures[future]] = future.result()
+                progress(done / len(batches))
+        return _normalize(np.concatenate(out)).astype(np.float32)
+
+    def _load(self):
+        with self._lock:
+            if self._matrix is None:
+                matrices, chunks = [], []
+                for digest, entry in self.manifest.items():
+                    if entry.get("model") != self.model:
+                        continue
+                    matrices.append(np.load(self._path(digest, ".npy"), mmap_mode="r"))
+                    with open(self._path(digest, ".jsonl")) as f:
+                        chunks.extend({"document": entry["name"], **json.loads(line)} for line in f)
+                self._matrix = np.concatenate(matrices) if matrices else np.empty((0, 0), dtype=np.float32)
+                self._chunks = chunks
+            return self._matrix, self._chunks
+
+    def _path(self, digest, suffix):
+        return os.path.join(self.root, digest + suffix)
+
+    def _write_doc(self, digest, vectors, chunks):
+        tmp = self._path(digest, f".{threading.get_ident()}.tmp.npy")
+        np.save(tmp, vectors)
+        os.replace(tmp, self._path(digest, ".npy"))
+        tmp = self._path(digest, f".{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            for page, text in chunks:
+                f.write(json.dumps({"page": page, "text": text}) + "\n")
+        os.replace(tmp, self._path(digest, ".jsonl"))
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.root, "manifest.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self):
+        path = os.path.join(self.root, "manifest.json")
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp, path)
+
+    def _doc_lock(self, digest):
+        with self._lock:
+            return self._doc_locks.setdefault(digest, threading.Lock())
+
+
+index = KnowledgeIndex()
@@ -0,0 +1,155 @@
+"""Process-wide TTL cache for Polygon responses.
+
+Streamlit reruns the whole script on every interaction; this cache sits under
+``PolygonClient.get_json`` so reruns (and other sessions on the same server)
+reuse responses until their endpoint-specific TTL runs out. Memory use is
+bounded by an approximate byte budget with LRU eviction, and an optional disk
+tier (``MARKET_CACHE_DIR``) keeps slow-changing data across restarts.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+MAX_BYTES = int(os.getenv("MARKET_CACHE_MAX_MB", "256")) * 1024 * 1024
+DISK_DIR = os.getenv("MARKET_CACHE_DIR", "")
+
+MARKET_TZ = ZoneInfo("America/New_York")
+
+# (kind, path fragment, ttl seconds); ttl None means "until the next close"
+ENDPOINTS = [
+    ("quotes", "/v2/snapshot/", 5),
+    ("aggregates", "/v2/aggs/", None),
+    ("options", "/v3/snapshot/options/", 60),
+    ("details", "/v3/reference/tickers/", 24 * 3600),
+]
+DEFAULT_TTL = 30
+
+# only long-lived kinds are worth a disk round trip
+DISK_KINDS = {"aggregates", "details"}
+
+MISS = object()
+
+
+def next_close(now=None):
+    now = now or datetime.now(MARKET_TZ)
+    close = now.replace(hour=16, minute=0, second=0, microsecond=0)
+    if now >= close:
+        close += timedelta(days=1)
+    while close.weekday() >= 5:
+        close += timedelta(days=1)
+    return close.timestamp()
+
+
+def classify(path):
+    for kind, fragment, ttl in ENDPOINTS:
+        if fragment in path:
+            return kind, (next_close() if ttl is None else time.time() + ttl)
+    return "other", time.time() + DEFAULT_TTL
+
+
+class MarketDataCache:
+    def __init__(self, max_bytes=MAX_BYTES, disk_dir=DISK_DIR):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._stats = {}
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key, kind):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, size, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._count(kind, hit=True)
+                    return value
+                self._drop(key)
+
+        if self.disk_dir and kind in DISK_KINDS:
+            value, expires_at = self._read_disk(key, now)
+            if value is not MISS:
+                self._store(key, value, expires_at)
+                with self._lock:
+                    self._count(kind, hit=True)
+                return value
+
+        with self._lock:
+            self._count(kind, hit=False)
+        return MISS
+
+    def put(self, key, kind, value, expires_at):
+        self._store(key, value, expires_at)
+        if self.disk_dir and kind in DISK_KINDS:
+            self._write_disk(key, value, expires_at)
+
+    def stats(self):
+        with self._lock:
+            out = {}
+            for kind, (hits, misses) in sorted(self._stats.items()):
+                total = hits + misses
+                out[kind] = {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+            out["_memory_mb"] = self._bytes / 1024 / 1024
+            return out
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _store(self, key, value, expires_at):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _count(self, kind, hit):
+        counts = self._stats.setdefault(kind, [0, 0])
+        counts[0 if hit else 1] += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, hashlib.sha1(repr(key).encode()).hexdigest() + ".pkl")
+
+    def _read_disk(self, key, now):
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                expires_at, value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return MISS, 0
+        if expires_at <= now:
+            return MISS, 0
+        return value, expires_at
+
+    def _write_disk(self, key, value, expires_at):
+        path = self._disk_path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump((expires_at, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+
+cache = MarketDataCache()
@@ -12,11 +12,22 @@ from agno.knowledge import KnowledgeBase
 from agno.storage.sqlite import SqliteStorage
 from agno.tool import tool
 import os
+import uuid
 from datetime import datetime, date
-import requests
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from polygon_client import get_client, parse_quote, quote_path
+from market_cache import cache as market_cache
+from bar_store import store as bar_store
+from options_analytics import analyze_chain
+from gex import gamma_exposure, summarize as summarize_gex
+from options_chain import load_chain
+import indicators
+from screener import ScreenError, screen_tickers as run_screen
+from tool_output import chain_relevance, compact
+from quote_stream import get_stream
+from kb_ingest import index as kb_index
 
 # ========================
 # PAGE CONFIG & TABS
@@ -52,6 +63,15 @@ with st.sidebar:
     watchlist_input = st.text_input("Watchlist Tickers (comma-separated, e.g., NVDA, TSLA, AAPL, BTC-USD)", value="NVDA, TSLA, AAPL")
     watchlist = [t.strip().upper() for t in watchlist_input.split(",") if t.strip()]
 
+# Shared, process-wide Polygon client (connection pool + request coalescing)
+polygon = get_client(polygon_api_key) if polygon_api_key else None
+
+# Live quotes: one WebSocket per server process, shared by all sessions
+stream = get_stream(polygon_api_key) if polygon_api_key and os.getenv("QUOTE_STREAM", "1") == "1" else None
+stream_session = st.session_state.setdefault("stream_session", uuid.uuid4().hex)
+STREAM_REFRESH_SECONDS = float(os.getenv("STREAM_REFRESH_SECONDS", "1"))
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "30"))
+
 # Model
 model = OpenAIChat(id="gpt-4o-2024-11-20")
 
@@ -61,111 +81,174 @@ memory = Memory(storage=storage)
 knowledge = KnowledgeBase(storage=storage)
 
 if uploaded_pdfs:
-    for pdf in uploaded_pdfs:
-        knowledge.add_pdf(pdf)
-    st.sidebar.success(f"{len(uploaded_pdfs)} PDFs added!")
+    # PDFs already in the on-disk index (same bytes) are skipped without re-parsing or re-embedding
+    fresh = [pdf for pdf in uploaded_pdfs if not kb_index.has(kb_index.digest(pdf.getvalue()))]
+    if fresh:
+        bar = st.sidebar.progress(0.0, text="Indexing PDFs...")
+        for i, pdf in enumerate(fresh):
+            try:
+                kb_index.ingest(pdf.name, pdf.getvalue(),
+                                progress=lambda done, msg, i=i: bar.progress((i + done) / len(fresh), text=msg))
+            except Exception as e:
+                st.sidebar.error(f"{pdf.name}: {e}")
+        bar.empty()
+    st.sidebar.success(f"{len(uploaded_pdfs)} PDFs indexed ({len(fresh)} new)")
 
 # ========================
 # CUSTOM TOOLS
 # ========================
 
-@tool
-def get_current_quote(ticker: str):
-    """Fetch real-time quote with change %"""
+def fetch_quote(ticker: str):
     if not polygon_api_key:
         return "Error: Polygon API key missing."
-    url = f"https://api.polygon.io/v2/snapshot/locale/us/markets/stocks/tickers/{ticker.upper()}?apiKey={polygon_api_key}"
     try:
-        data = requests.get(url).json()
+        data = polygon.get_json(quote_path(ticker))
         if "ticker" in data:
-            t = data["ticker"]
-            day = t.get("day", {})
-            prev = t.get("prevDay", {})
-            price = day.get("c") or t.get("lastTrade", {}).get("p")
-            prev_close = prev.get("c", price)
-            change = price - prev_close if prev_close else 0
-            change_pct = (change / prev_close * 100) if prev_close else 0
-            return {
-                "price": price,
-                "change": change,
-                "change_percent": change_pct,
-                "volume": day.get("v", 0),
-                "open": day.get("o"),
-                "high": day.get("h"),
-                "low": day.get("l")
-            }
+            return parse_quote(data["ticker"])
         return "No quote found."
     except:
         return "Error fetching quote."
 
 @tool
-def get_stock_data(ticker: str, days: int = 365):
+@compact()
+def get_current_quote(ticker: str):
+    """Fetch real-time quote with change %"""
+    return fetch_quote(ticker)
+
+@tool
+@compact()
+def get_watchlist_quotes(tickers: str):
+    """Fetch real-time quotes with change % for several comma-separated tickers in one call"""
+    if not polygon_api_key:
+        return "Error: Polygon API key missing."
+    try:
+        quotes = polygon.get_quotes_bulk(t.strip() for t in tickers.split(",") if t.strip())
+        return quotes or "No quotes found."
+    except:
+        return "Error fetching quotes."
+
+def fetch_stock_data(ticker: str, days: int = 365):
     if not polygon_api_key:
         return "Error: Polygon API key missing."
-    url = f"https://api.polygon.io/v2/aggs/ticker/{ticker.upper()}/range/1/day/2020-01-01/{datetime.today().strftime('%Y-%m-%d')}?adjusted=true&limit=5000&apiKey={polygon_api_key}"
     try:
-        data = requests.get(url).json()
-        if "results" not in data:
+        # local bar store: only bars since the last stored day are downloaded
+        bars = bar_store.update(polygon, ticker)
+        if not len(bars):
             return f"No data for {ticker}"
-        results = data["results"][-days:]
-        df_data = [{"date": datetime.fromtimestamp(r["t"]/1000).strftime('%Y-%m-%d'), "open": r["o"], "high": r["h"], "low": r["l"], "close": r["c"], "volume": r["v"]} for r in results]
+        results = bars[-days:]
+        df_data = [{"date": datetime.fromtimestamp(r["t"]/1000).strftime('%Y-%m-%d'), "open": float(r["o"]), "high": float(r["h"]), "low": float(r["l"]), "close": float(r["c"]), "volume": float(r["v"])} for r in results]
         return {"ticker": ticker.upper(), "data": df_data}
     except:
         return "Error."
 
+@tool
+@compact()
+def get_stock_data(ticker: str, days: int = 365):
+    """Daily OHLCV bars: full-period stats plus a downsampled series"""
+    return fetch_stock_data(ticker, days)
+
 # Other tools (get_ticker_details, get_earnings_calendar, get_ticker_news, search_earnings_transcript) remain the same as before
 
-@tool
-def get_options_snapshot(ticker: str):
+def fetch_options_chain(ticker: str, expiration_gte=None, expiration_lte=None, strike_gte=None, strike_lte=None):
     if not polygon_api_key:
         return "Error: Polygon API key missing."
-    url = f"https://api.polygon.io/v3/snapshot/options/{ticker.upper()}?apiKey={polygon_api_key}"
     try:
-        data = requests.get(url).json()
-        if "results" not in data:
+        chain = load_chain(polygon, ticker, expiration_gte=expiration_gte, expiration_lte=expiration_lte,
+                           strike_gte=strike_gte, strike_lte=strike_lte)
+        if not len(chain):
             return "No options data found."
-        
-        underlying = data["results"]["underlying_asset"]
-        underlying_price = underlying.get("price") or underlying.get("last_quote", {}).get("P", "N/A")
-        
-        options = data["results"]["options"]
-        calls = []
-        puts = []
-        for opt in options:
-            details = opt["details"]
-            quote = opt.get("last_quote", {})
-            greeks = opt.get("greeks", {})
-            oi = opt.get("open_interest", 0)
-            volume = opt.get("volume", 0)
-            
-            row = {
-                "Expiration": details["expiration_date"],
-                "Strike": details["strike_price"],
-                "Bid": quote.get("bid"),
-                "Ask": quote.get("ask"),
-                "Last": quote.get("last"),
-                "Volume": volume,
-                "Open Interest": oi,
-                "Implied Volatility": greeks.get("implied_volatility"),
-                "Delta": greeks.get("delta"),
-                "Gamma": greeks.get("gamma"),
-                "Theta": greeks.get("theta"),
-                "Vega": greeks.get("vega"),
-                "Unusual": volume > oi if oi else False  # Simple unusual flag
-            }
-            if details["contract_type"] == "call":
-                calls.append(row)
-            else:
-                puts.append(row)
-        
+        calls, puts = chain.to_frames()
         return {
-            "underlying_price": underlying_price,
-            "calls": pd.DataFrame(calls),
-            "puts": pd.DataFrame(puts)
+            "underlying_price": chain.underlying_price or "N/A",
+            "calls": calls,
+            "puts": puts
         }
     except Exception as e:
         return f"Error: {str(e)}"
 
+@tool
+@compact(rank_by=chain_relevance)
+def get_options_snapshot(ticker: str, expiration_gte: str = None, expiration_lte: str = None,
+                         strike_gte: float = None, strike_lte: float = None):
+    """Options chain for a ticker; optional expiration (YYYY-MM-DD) and strike bounds are filtered server-side"""
+    return fetch_options_chain(ticker, expiration_gte, expiration_lte, strike_gte, strike_lte)
+
+@tool
+@compact()
+def get_options_analytics(ticker: str):
+    """Max pain, put/call ratios (volume and OI) per expiration and the most unusual contracts"""
+    chain = fetch_options_chain(ticker)
+    if not isinstance(chain, dict):
+        return chain
+    analytics = analyze_chain(chain["calls"], chain["puts"], top_unusual=10)
+    if analytics["by_expiration"].empty:
+        return "No options data found."
+    return {
+        "underlying_price": chain["underlying_price"],
+        "by_expiration": analytics["by_expiration"].head(12).round(3).reset_index().to_dict("records"),
+        "unusual": analytics["unusual"][["Expiration", "Strike", "Type", "Volume", "Open Interest", "score"]]
+            .round(2).to_dict("records"),
+    }
+
+@tool
+@compact()
+def get_technical_summary(ticker: str):
+    """Latest SMA50/200 trend, EMA20, Wilder RSI, MACD, Bollinger %B, ATR and 20-day VWAP for a ticker"""
+    if not polygon_api_key:
+        return "Error: Polygon API key missing."
+    try:
+        bars = bar_store.update(polygon, ticker)
+        if not len(bars):
+            return f"No data for {ticker}"
+        return {"ticker": ticker.upper(), **indicators.summarize(bars["h"], bars["l"], bars["c"], bars["v"])}
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+@tool
+@compact()
+def screen_tickers(universe: str, criteria: str = "", sort_by: str = "change_1d_pct", descending: bool = True,
+                   top: int = 10):
+    """Screen many comma-separated tickers in one call and return the ranked top matches.
+
+    criteria: comma-separated comparisons of a field with a number or another field,
+    e.g. "rsi < 30, close > sma200, avg_volume20 > 1e6, put_call_volume > 1.5".
+    Fields: close, change_1d_pct, change_5d_pct, change_20d_pct, change_60d_pct, sma50, sma200,
+    pct_above_sma50, pct_above_sma200, ema20, rsi, macd, macd_signal, macd_hist, bb_pct_b, atr_pct,
+    vwap20, avg_volume20, dollar_volume20, pct_from_52w_high, and options fields options_volume,
+    put_call_volume, put_call_oi, atm_iv, unusual_contracts (next 45 days of expirations)."""
+    if not polygon_api_key:
+        return "Error: Polygon API key missing."
+    try:
+        frame, stats = run_screen(polygon, universe.split(","), criteria, sort_by=sort_by,
+                                  descending=descending, top=top)
+    except ScreenError as e:
+        return f"Error: {e}"
+    except Exception as e:
+        return f"Error: {str(e)}"
+    return {**stats, "results": frame.round(2).to_dict("records")}
+
+@tool
+@compact()
+def search_knowledge_base(query: str, top: int = 5):
+    """Search uploaded reports/PDFs; returns the most relevant passages with document and page"""
+    try:
+        hits = kb_index.search(query, top=top)
+    except Exception as e:
+        return f"Error: {str(e)}"
+    return hits or "Knowledge base is empty."
+
+@tool
+@compact()
+def get_gamma_exposure(ticker: str):
+    """Dealer gamma exposure: total and per-strike GEX, zero-gamma flip level, call and put walls"""
+    chain = fetch_options_chain(ticker)
+    if not isinstance(chain, dict):
+        return chain
+    result = gamma_exposure(chain["calls"], chain["puts"], chain["underlying_price"])
+    if result is None:
+        return "Not enough open interest / IV data to estimate gamma exposure."
+    return summarize_gex(result)
+
 # ========================
 # AGENTS & TEAM (updated with new tools)
 # ========================
@@ -175,15 +258,48 @@ def get_options_snapshot(ticker: str):
 options_analyst = Agent(
     name="Options Analyst",
     model=model,
-    tools=[get_options_snapshot, get_current_quote],
+    tools=[get_options_snapshot, get_options_analytics, get_gamma_exposure, get_technical_summary,
+           screen_tickers, search_knowledge_base, get_current_quote, get_watchlist_quotes],
     role="""Advanced options strategist.
     - Detects unusual activity, skew, max pain, PCR
     - Estimates gamma exposure and dealer positioning
+    - Checks trend and momentum (moving averages, RSI, MACD, ATR)
+    - Screens whole sectors or watchlists in a single screen_tickers call
     - Combines with sentiment and catalysts""",
 )
 
 # Update team members and instructions accordingly
 
+# ========================
+# LIVE WATCHLIST
+# ========================
+
+@st.fragment(run_every=STREAM_REFRESH_SECONDS if stream else None)
+def live_watchlist(symbols):
+    # only this fragment reruns on the timer; quotes come from the shared tick buffers
+    if stream:
+        stream.set_symbols(stream_session, symbols)
+        status = stream.stats()
+        # REST seeds each symbol once per process; while the socket is down the
+        # shared snapshot is refreshed at a slow rate instead of on every tick
+        stale = stream.unseeded(symbols, None if status["connected"] else SNAPSHOT_REFRESH_SECONDS)
+        if stale:
+            stream.seed(polygon.get_quotes_bulk(stale), stale)
+        quotes = stream.quotes(symbols)
+    else:
+        # one multi-ticker snapshot call per 100 tickers
+        quotes = polygon.get_quotes_bulk(symbols)
+    cols = st.columns(len(symbols))
+    for i, t in enumerate(symbols):
+        with cols[i]:
+            quote = quotes.get(t)
+            if quote:
+                delta = f"{quote['change_percent']:+.2f}%"
+                st.metric(label=t, value=f"${quote['price']:.2f}", delta=delta)
+    if stream:
+        st.caption("🟢 Live (WebSocket)" if status["connected"]
+                   else f"🟡 REST snapshot every {SNAPSHOT_REFRESH_SECONDS:.0f}s ({status['error'] or 'connecting'})")
+
 # ========================
 # TAB 2: ADVANCED DASHBOARD
 # ========================
@@ -194,21 +310,15 @@ with tabs[1]:
     # Watchlist
     if watchlist and polygon_api_key:
         st.subheader("Watchlist")
-        cols = st.columns(len(watchlist))
-        for i, t in enumerate(watchlist):
-            with cols[i]:
-                quote = get_current_quote(t)
-                if isinstance(quote, dict):
-                    delta = f"{quote['change_percent']:+.2f}%"
-                    st.metric(label=t, value=f"${quote['price']:.2f}", delta=delta)
+        live_watchlist(tuple(watchlist))
 
     ticker_input = st.text_input("Analyze Ticker (Stocks or Crypto, e.g., NVDA, BTC-USD)", value="NVDA").upper()
 
     if ticker_input and polygon_api_key:
-        quote = get_current_quote(ticker_input)
+        quote = fetch_quote(ticker_input)
         details = get_ticker_details(ticker_input)
-        price_data = get_stock_data(ticker_input)
-        options_data = get_options_snapshot(ticker_input)
+        price_data = fetch_stock_data(ticker_input)
+        options_data = fetch_options_chain(ticker_input)
         earnings = get_earnings_calendar(ticker_input)
         news = get_ticker_news(ticker_input)
 
@@ -228,16 +338,11 @@ with tabs[1]:
             df["date"] = pd.to_datetime(df["date"])
             df = df.sort_values("date")
 
-            # Indicators
-            df["SMA50"] = df["close"].rolling(50).mean()
-            df["SMA200"] = df["close"].rolling(200).mean()
-
-            # RSI
-            delta = df["close"].diff()
-            gain = delta.where(delta > 0, 0).rolling(14).mean()
-            loss = -delta.where(delta < 0, 0).rolling(14).mean()
-            rs = gain / loss
-            df["RSI"] = 100 - (100 / (1 + rs))
+            # Indicators (Wilder RSI)
+            close = df["close"].to_numpy(dtype=float)
+            df["SMA50"] = indicators.sma(close, 50)
+            df["SMA200"] = indicators.sma(close, 200)
+            df["RSI"] = indicators.rsi(close)
 
             # Plot
             fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.05,
@@ -278,45 +383,22 @@ with tabs[1]:
                 calls_filtered = calls_df[calls_df["Expiration"] == selected_exp].sort_values("Strike")
                 puts_filtered = puts_df[puts_df["Expiration"] == selected_exp].sort_values("Strike", ascending=False)
 
-                # Advanced Metrics
+                # Advanced Metrics (all expirations computed in one vectorized pass)
+                analytics = analyze_chain(calls_df, puts_df)
+                exp_stats = analytics["by_expiration"].loc[selected_exp]
                 colm1, colm2, colm3, colm4 = st.columns(4)
-                call_vol = calls_filtered["Volume"].sum()
-                put_vol = puts_filtered["Volume"].sum()
-                pcr_vol = put_vol / call_vol if call_vol > 0 else float("inf")
-                
-                call_oi = calls_filtered["Open Interest"].sum()
-                put_oi = puts_filtered["Open Interest"].sum()
-                pcr_oi = put_oi / call_oi if call_oi > 0 else float("inf")
 
                 with colm1:
-                    st.metric("Put/Call Volume Ratio", f"{pcr_vol:.2f}")
+                    st.metric("Put/Call Volume Ratio", f"{exp_stats['pcr_volume']:.2f}")
                 with colm2:
-                    st.metric("Put/Call OI Ratio", f"{pcr_oi:.2f}")
+                    st.metric("Put/Call OI Ratio", f"{exp_stats['pcr_oi']:.2f}")
                 with colm3:
-                    unusual_count = len(calls_filtered[calls_filtered["Unusual"]]) + len(puts_filtered[puts_filtered["Unusual"]])
-                    st.metric("Unusual Activity Contracts", unusual_count)
-
-                # Max Pain
-                strikes = sorted(set(calls_filtered["Strike"]) | set(puts_filtered["Strike"]))
-                pain_dict = {}
-                for strike in strikes:
-                    pain = 0.0
-                    # Calls ITM
-                    call_oi_at = calls_filtered[calls_filtered["Strike"] == strike]["Open Interest"].sum() if strike in calls_filtered["Strike"].values else 0
-                    if strike < spot:
-                        pain += call_oi_at * (spot - strike) * 100
-                    # Puts ITM
-                    put_oi_at = puts_filtered[puts_filtered["Strike"] == strike]["Open Interest"].sum() if strike in puts_filtered["Strike"].values else 0
-                    if strike > spot:
-                        pain += put_oi_at * (strike - spot) * 100
-                    pain_dict[strike] = pain
-                if pain_dict:
-                    max_pain = min(pain_dict, key=pain_dict.get)
-                    with colm4:
-                        st.metric("Max Pain Strike", f"${max_pain:.2f}")
+                    st.metric("Unusual Activity Contracts", int(exp_stats["unusual_count"]))
+                with colm4:
+                    st.metric("Max Pain Strike", f"${exp_stats['max_pain']:.2f}")
 
                 # Tables with highlighting
-                opt_tabs = st.tabs(["Calls", "Puts", "Volume/OI Chart", "IV Skew"])
+                opt_tabs = st.tabs(["Calls", "Puts", "Volume/OI Chart", "IV Skew", "Gamma Exposure"])
 
                 with opt_tabs[0]:
                     if not calls_filtered.empty:
@@ -359,9 +441,38 @@ with tabs[1]:
                         fig_iv.update_yaxes(tickformat=".2%")
                         st.plotly_chart(fig_iv, use_container_width=True)
 
+                with opt_tabs[4]:
+                    # dealer positioning across all expirations
+                    gex_result = gamma_exposure(calls_df, puts_df, spot)
+                    if gex_result:
+                        g1, g2, g3, g4 = st.columns(4)
+                        g1.metric("Net GEX ($ / 1%)", f"{gex_result['total_gex'] / 1e6:,.1f}M")
+                        g2.metric("Zero-Gamma Flip", f"${gex_result['zero_gamma']:.2f}" if gex_result["zero_gamma"] else "n/a")
+                        g3.metric("Call Wall", f"${gex_result['call_wall']:.2f}")
+                        g4.metric("Put Wall", f"${gex_result['put_wall']:.2f}")
+                        near = abs(gex_result["strikes"] - spot) <= spot * 0.15
+                        fig_gex = go.Figure()
+                        fig_gex.add_trace(go.Bar(x=gex_result["strikes"][near], y=gex_result["call_gex"][near], name="Call GEX"))
+                        fig_gex.add_trace(go.Bar(x=gex_result["strikes"][near], y=gex_result["put_gex"][near], name="Put GEX"))
+                        fig_gex.add_vline(x=spot, line_dash="dash", line_color="gray")
+                        if gex_result["zero_gamma"]:
+                            fig_gex.add_vline(x=gex_result["zero_gamma"], line_dash="dot", line_color="orange")
+                        fig_gex.update_layout(barmode="relative", title="Gamma Exposure by Strike")
+                        st.plotly_chart(fig_gex, use_container_width=True)
+                    else:
+                        st.info("Not enough open interest / IV data to estimate gamma exposure.")
+
         # Earnings & News remain similar
 
     elif ticker_input:
         st.warning("Polygon.io API key required for advanced dashboard features.")
 
+# Rendered last so the numbers include this rerun's requests
+with st.sidebar:
+    st.header("⚡ Market Data Cache")
+    cache_stats = market_cache.stats()
+    st.caption(f"{cache_stats.pop('_memory_mb'):.1f} MB in memory")
+    for kind, stat in cache_stats.items():
+        st.write(f"**{kind}**: {stat['hit_rate']:.0%} hits ({stat['hits']}/{stat['hits'] + stat['misses']})")
+
 st.caption("2026 Advanced Edition • Agno + GPT-4o + Polygon.io • Professional options & technical analysis terminal")
\ No newline at end of file
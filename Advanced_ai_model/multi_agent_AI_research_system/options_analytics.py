@@ -0,0 +1,81 @@
+"""Vectorized options-chain analytics: max pain, put/call ratios, unusual activity.
+
+Works on the calls/puts DataFrames produced by ``get_options_snapshot`` and
+computes every expiration in one pass, so the dashboard and the Options
+Analyst agent share the same numbers.
+"""
+
+import numpy as np
+import pandas as pd
+
+CONTRACT_SIZE = 100
+
+
+def combine(calls, puts):
+    """Stack calls and puts into one frame with a ``Type`` column."""
+    frames = [df.assign(Type=typ) for df, typ in ((calls, "call"), (puts, "put")) if not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=["Expiration", "Strike", "Volume", "Open Interest", "Type"])
+    chain = pd.concat(frames, ignore_index=True)
+    chain["Volume"] = chain["Volume"].fillna(0).astype(float)
+    chain["Open Interest"] = chain["Open Interest"].fillna(0).astype(float)
+    return chain
+
+
+def max_pain(chain):
+    """Settlement strike minimising total option-holder payout, per expiration.
+
+    Every listed strike of an expiration is a candidate settlement price; the
+    payout of all contracts is evaluated against all candidates at once with a
+    (candidates x strikes) broadcast.
+    """
+    oi = chain.groupby(["Expiration", "Strike", "Type"])["Open Interest"].sum().unstack("Type", fill_value=0)
+    oi = oi.reindex(columns=["call", "put"], fill_value=0)
+
+    out = {}
+    for exp, group in oi.groupby(level="Expiration", sort=True):
+        strikes = group.index.get_level_values("Strike").to_numpy(dtype=float)
+        diff = strikes[:, None] - strikes[None, :]
+        pain = (np.maximum(diff, 0) @ group["call"].to_numpy(dtype=float)
+                + np.maximum(-diff, 0) @ group["put"].to_numpy(dtype=float)) * CONTRACT_SIZE
+        out[exp] = strikes[np.argmin(pain)]
+    return pd.Series(out, name="max_pain", dtype=float)
+
+
+def expiry_summary(chain):
+    """Per-expiration volume/OI totals, put/call ratios and max pain."""
+    totals = chain.groupby(["Expiration", "Type"])[["Volume", "Open Interest"]].sum().unstack("Type", fill_value=0)
+    summary = pd.DataFrame(index=totals.index)
+    for metric, col in (("volume", "Volume"), ("oi", "Open Interest")):
+        calls = totals[col].get("call", pd.Series(0.0, index=totals.index))
+        puts = totals[col].get("put", pd.Series(0.0, index=totals.index))
+        summary[f"call_{metric}"] = calls
+        summary[f"put_{metric}"] = puts
+        summary[f"pcr_{metric}"] = (puts / calls.where(calls > 0)).fillna(np.inf)
+    summary["max_pain"] = max_pain(chain)
+    return summary
+
+
+def unusual_activity(chain, top=20):
+    """Score contracts by volume relative to open interest and to their expiry peers."""
+    volume = chain["Volume"]
+    log_volume = np.log1p(volume)
+    by_exp = log_volume.groupby(chain["Expiration"])
+    zscore = ((log_volume - by_exp.transform("mean")) / by_exp.transform("std").replace(0, np.nan)).fillna(0)
+    scored = chain.assign(
+        vol_oi=volume / (chain["Open Interest"] + 1),
+        score=volume / (chain["Open Interest"] + 1) * (1 + zscore.clip(lower=0)),
+    )
+    scored = scored[volume > 0]
+    return scored.nlargest(top, "score")
+
+
+def analyze_chain(calls, puts, top_unusual=20):
+    chain = combine(calls, puts)
+    if chain.empty:
+        return {"by_expiration": pd.DataFrame(), "unusual": chain}
+    summary = expiry_summary(chain)
+    unusual = unusual_activity(chain, top_unusual)
+    flagged = (chain["Volume"] > chain["Open Interest"]) & (chain["Open Interest"] > 0)
+    summary["unusual_count"] = flagged.groupby(chain["Expiration"]).sum()
+    return {"by_expiration": summary, "unusual": unusual}
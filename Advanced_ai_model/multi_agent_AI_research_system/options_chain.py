@@ -0,0 +1,168 @@
+"""Paginated options-chain loader with columnar storage.
+
+``/v3/snapshot/options/{underlying}`` returns at most 250 contracts per page
+and links the rest through ``next_url``. Calls and puts are walked as two
+independent cursors in parallel, and every page is written straight into
+preallocated, typed NumPy columns instead of one Python dict per contract.
+Expiry/strike filters are passed to Polygon so unwanted contracts are never
+downloaded.
+"""
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from polygon_client import run_sync
+
+PAGE_LIMIT = 250
+CHAIN_TTL = 60
+
+FLOAT_COLUMNS = ["strike", "bid", "ask", "last", "iv", "delta", "gamma", "theta", "vega"]
+INT_COLUMNS = ["open_interest", "volume"]
+
+# columnar name -> DataFrame column used by the dashboard and analytics
+FRAME_COLUMNS = {
+    "expiration": "Expiration",
+    "strike": "Strike",
+    "bid": "Bid",
+    "ask": "Ask",
+    "last": "Last",
+    "volume": "Volume",
+    "open_interest": "Open Interest",
+    "iv": "Implied Volatility",
+    "delta": "Delta",
+    "gamma": "Gamma",
+    "theta": "Theta",
+    "vega": "Vega",
+}
+
+
+class ChainColumns:
+    """Growable set of typed column arrays for one side of a chain."""
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.cols = {name: np.full(capacity, np.nan) for name in FLOAT_COLUMNS}
+        self.cols.update({name: np.zeros(capacity, dtype=np.int64) for name in INT_COLUMNS})
+        self.cols["expiration"] = np.empty(capacity, dtype="datetime64[D]")
+        self.cols["is_call"] = np.zeros(capacity, dtype=bool)
+
+    def append_page(self, results):
+        n = len(results)
+        if not n:
+            return
+        self._reserve(self.size + n)
+        lo, hi = self.size, self.size + n
+
+        def num(values):
+            return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+        details = [r.get("details", {}) for r in results]
+        quotes = [r.get("last_quote", {}) for r in results]
+        greeks = [r.get("greeks", {}) for r in results]
+        c = self.cols
+        c["strike"][lo:hi] = num(d.get("strike_price") for d in details)
+        c["expiration"][lo:hi] = np.array([d.get("expiration_date") for d in details], dtype="datetime64[D]")
+        c["is_call"][lo:hi] = [d.get("contract_type") == "call" for d in details]
+        c["bid"][lo:hi] = num(q.get("bid") for q in quotes)
+        c["ask"][lo:hi] = num(q.get("ask") for q in quotes)
+        c["last"][lo:hi] = num((r.get("last_trade") or {}).get("price", (r.get("day") or {}).get("close"))
+                               for r in results)
+        c["iv"][lo:hi] = num(r.get("implied_volatility", g.get("implied_volatility")) for r, g in zip(results, greeks))
+        for greek in ("delta", "gamma", "theta", "vega"):
+            c[greek][lo:hi] = num(g.get(greek) for g in greeks)
+        c["open_interest"][lo:hi] = [r.get("open_interest") or 0 for r in results]
+        c["volume"][lo:hi] = [(r.get("day") or {}).get("volume", r.get("volume")) or 0 for r in results]
+        self.size = hi
+
+    def _reserve(self, needed):
+        capacity = len(self.cols["strike"])
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name, arr in self.cols.items():
+            grown = np.full(capacity, np.nan) if arr.dtype == float else np.zeros(capacity, dtype=arr.dtype)
+            grown[:self.size] = arr[:self.size]
+            self.cols[name] = grown
+
+    def view(self):
+        return {name: arr[:self.size] for name, arr in self.cols.items()}
+
+
+class OptionsChain:
+    def __init__(self, underlying_price, columns):
+        self.underlying_price = underlying_price
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["strike"])
+
+    def to_frames(self):
+        """(calls, puts) DataFrames in the dashboard's column layout."""
+        cols = self.columns
+        data = {FRAME_COLUMNS[name]: cols[name] for name in FRAME_COLUMNS if name != "expiration"}
+        frame = pd.DataFrame(data)
+        frame.insert(0, "Expiration", cols["expiration"].astype(str))
+        oi, volume = cols["open_interest"], cols["volume"]
+        frame["Unusual"] = (oi > 0) & (volume > oi)
+        is_call = cols["is_call"]
+        return frame[is_call].reset_index(drop=True), frame[~is_call].reset_index(drop=True)
+
+
+def _params(contract_type, expiration_gte, expiration_lte, strike_gte, strike_lte):
+    params = {"contract_type": contract_type, "limit": PAGE_LIMIT}
+    for key, value in (("expiration_date.gte", expiration_gte), ("expiration_date.lte", expiration_lte),
+                       ("strike_price.gte", strike_gte), ("strike_price.lte", strike_lte)):
+        if value is not None:
+            params[key] = value
+    return params
+
+
+async def _walk(client, ticker, params, columns, underlying):
+    data = await client.aget_json(f"/v3/snapshot/options/{ticker}", params, use_cache=False)
+    while True:
+        results = data.get("results") or []
+        if results and not underlying:
+            asset = results[0].get("underlying_asset") or {}
+            underlying.append(asset.get("price") or (asset.get("last_quote") or {}).get("P"))
+        columns.append_page(results)
+        if not data.get("next_url"):
+            break
+        data = await client.aget_json(data["next_url"], use_cache=False)
+
+
+async def _load(client, ticker, **filters):
+    sides = {side: ChainColumns() for side in ("call", "put")}
+    underlying = []
+    await asyncio.gather(*(_walk(client, ticker, _params(side, **filters), cols, underlying)
+                           for side, cols in sides.items()))
+    calls, puts = sides["call"].view(), sides["put"].view()
+    merged = {name: np.concatenate([calls[name], puts[name]]) for name in calls}
+    return OptionsChain(underlying[0] if underlying else None, merged)
+
+
+_chains = {}
+_chains_lock = threading.Lock()
+
+
+def load_chain(client, ticker, expiration_gte=None, expiration_lte=None, strike_gte=None, strike_lte=None):
+    """Full (optionally filtered) chain, reused for ``CHAIN_TTL`` seconds across reruns."""
+    filters = {"expiration_gte": expiration_gte, "expiration_lte": expiration_lte,
+               "strike_gte": strike_gte, "strike_lte": strike_lte}
+    key = (ticker.upper(), tuple(filters.values()))
+    now = time.time()
+    with _chains_lock:
+        hit = _chains.get(key)
+        if hit and hit[0] > now:
+            return hit[1]
+
+    chain = run_sync(_load(client, ticker.upper(), **filters))
+    with _chains_lock:
+        for stale in [k for k, (until, _) in _chains.items() if until <= now]:
+            del _chains[stale]
+        _chains[key] = (now + CHAIN_TTL, chain)
+    return chain
@@ -0,0 +1,189 @@
+"""Shared Polygon.io client for the finance terminal.
+
+One client per API key lives for the whole Streamlit server process, so every
+session and rerun reuses the same keep-alive connection pool. Identical
+requests that are already in flight are coalesced, all requests share one
+concurrency/rate budget sized for the Polygon tier, and 429/5xx responses are
+retried with jittered exponential backoff.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from market_cache import MISS, cache as market_cache, classify
+
+BASE_URL = "https://api.polygon.io"
+
+# Free tier: 5 requests/minute. Paid tiers are effectively unlimited, so the
+# default only caps concurrency.
+MAX_CONCURRENCY = int(os.getenv("POLYGON_MAX_CONCURRENCY", "10"))
+RATE_PER_MINUTE = int(os.getenv("POLYGON_RATE_PER_MINUTE", "0"))
+
+# tickers per multi-ticker snapshot call, keeps the query string well under URL limits
+BULK_CHUNK = 100
+
+
+class PolygonError(Exception):
+    pass
+
+
+class PolygonClient:
+    def __init__(self, api_key, max_concurrency=MAX_CONCURRENCY, rate_per_minute=RATE_PER_MINUTE,
+                 timeout=10, max_retries=4, cache=market_cache):
+        self.api_key = api_key
+        self.cache = cache
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._interval = 60.0 / rate_per_minute if rate_per_minute else 0.0
+        self._next_start = 0.0
+        self._pace_lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def get_json(self, path, params=None, use_cache=True):
+        """GET a Polygon path (or a full ``next_url``) and return the decoded JSON."""
+        params = params or {}
+        key = (path, tuple(sorted(params.items())))
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            kind, expires_at = classify(path)
+            cached = self.cache.get(key, kind)
+            if cached is not MISS:
+                return cached
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._fetch(path, params)
+            if use_cache and result.get("status") != "ERROR":
+                self.cache.put(key, kind, result, expires_at)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    async def aget_json(self, path, params=None, use_cache=True):
+        return await asyncio.to_thread(self.get_json, path, params, use_cache)
+
+    async def gather(self, calls):
+        return await asyncio.gather(*(self.aget_json(path, params) for path, params in calls),
+                                    return_exceptions=True)
+
+    def fetch_many(self, calls):
+        """Fetch ``[(path, params), ...]`` concurrently; failed calls come back as exceptions."""
+        calls = list(calls)
+        if not calls:
+            return []
+        return run_sync(self.gather(calls))
+
+    def get_quotes_bulk(self, tickers, chunk_size=BULK_CHUNK):
+        """Quotes for many tickers via the multi-ticker snapshot, keyed by ticker.
+
+        Tickers Polygon has no snapshot for are simply missing from the result.
+        """
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+        pages = self.fetch_many(
+            ("/v2/snapshot/locale/us/markets/stocks/tickers", {"tickers": ",".join(chunk)})
+            for chunk in chunks
+        )
+        quotes = {}
+        for page in pages:
+            if isinstance(page, Exception):
+                continue
+            for t in page.get("tickers") or []:
+                quotes[t["ticker"]] = parse_quote(t)
+        return quotes
+
+    def _fetch(self, path, params):
+        url = path if path.startswith("http") else BASE_URL + path
+        params = {**params, "apiKey": self.api_key}
+        for attempt in range(self.max_retries + 1):
+            self._pace()
+            with self._slots:
+                resp = self.session.get(url, params=params, timeout=self.timeout)
+            retryable = resp.status_code == 429 or resp.status_code >= 500
+            if retryable and attempt < self.max_retries:
+                retry_after = resp.headers.get("Retry-After")
+                delay = float(retry_after) if retry_after else min(8.0, 0.5 * 2 ** attempt)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                continue
+            if resp.status_code >= 400:
+                raise PolygonError(f"{resp.status_code} from {path}: {resp.text[:200]}")
+            return resp.json()
+
+    def _pace(self):
+        if not self._interval:
+            return
+        with self._pace_lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self._interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def run_sync(coro):
+    """Run a coroutine to completion from sync code, even inside a running event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key):
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = PolygonClient(api_key)
+        return client
+
+
+def parse_quote(t):
+    """Turn one ticker snapshot into the quote schema used by the dashboard and agents."""
+    day = t.get("day", {})
+    prev = t.get("prevDay", {})
+    price = day.get("c") or t.get("lastTrade", {}).get("p")
+    prev_close = prev.get("c", price)
+    change = price - prev_close if prev_close else 0
+    change_pct = (change / prev_close * 100) if prev_close else 0
+    return {
+        "price": price,
+        "change": change,
+        "change_percent": change_pct,
+        "volume": day.get("v", 0),
+        "open": day.get("o"),
+        "high": day.get("h"),
+        "low": day.get("l")
+    }
+
+
+def quote_path(ticker):
+    return f"/v2/snapshot/locale/us/markets/stocks/tickers/{ticker.upper()}"
@@ -0,0 +1,417 @@
+"""Live trades/quotes from Polygon's WebSocket feed, shared by every session.
+
+One consumer thread per server process holds a single socket and keeps a ring
+buffer of recent ticks per symbol. Sessions declare the symbols they display
+with ``set_symbols``; subscriptions are reference-counted across sessions, so
+a symbol is subscribed once no matter how many users watch it and dropped when
+the last one leaves. Streamlit has no session-end hook, so a session that
+stops refreshing for ``SESSION_TTL`` seconds releases its symbols.
+
+Each symbol is seeded once from a REST snapshot (previous close, day volume
+and range); after that its quote comes from ticks alone, and the snapshot is
+only served, and refreshed at a slow shared rate, while no tick has arrived.
+
+Point ``POLYGON_WS_URL`` at the replay server in this module to run the
+dashboard against recorded ticks::
+
+    python quote_stream.py record ticks.jsonl NVDA,TSLA,AAPL --seconds 300
+    python quote_stream.py replay ticks.jsonl --port 8765
+    POLYGON_WS_URL=ws://localhost:8765 streamlit run multi_agent_AI_research_system.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+WS_URL = os.getenv("POLYGON_WS_URL", "wss://socket.polygon.io/stocks")
+BUFFER_SIZE = int(os.getenv("TICK_BUFFER", "512"))
+SESSION_TTL = 60
+REAP_INTERVAL = 5
+
+TICK_DTYPE = np.dtype([
+    ("t", "<i8"),
+    ("price", "<f8"),
+    ("size", "<f8"),
+    ("bid", "<f8"),
+    ("ask", "<f8"),
+])
+
+
+class TickBuffer:
+    """Fixed-size ring of ticks; every row carries the latest trade and quote forward."""
+
+    def __init__(self, size=BUFFER_SIZE):
+        self.rows = np.zeros(size, dtype=TICK_DTYPE)
+        self.count = 0
+        self.last = np.array((0, np.nan, 0.0, np.nan, np.nan), dtype=TICK_DTYPE)
+
+    def append(self, t, price=None, size=None, bid=None, ask=None):
+        last = self.last
+        last["t"] = t or last["t"]
+        if price is not None:
+            last["price"], last["size"] = price, size or 0
+        if bid is not None:
+            last["bid"] = bid
+        if ask is not None:
+            last["ask"] = ask
+        self.rows[self.count % len(self.rows)] = last
+        self.count += 1
+
+    def recent(self):
+        """Buffered ticks, oldest first."""
+        n = len(self.rows)
+        if self.count <= n:
+            return self.rows[:self.count].copy()
+        i = self.count % n
+        return np.concatenate([self.rows[i:], self.rows[:i]])
+
+
+class QuoteStream:
+    def __init__(self, api_key, url=WS_URL, buffer_size=BUFFER_SIZE):
+        self.api_key = api_key
+        self.url = url
+        self.buffer_size = buffer_size
+        self.connected = False
+        self.last_error = None
+        self._buffers = {}
+        self._snapshots = {}
+        self._seeded_at = {}
+        self._sessions = {}
+        self._refs = Counter()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._wake = None
+        self._thread = None
+
+    # --- session side --------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._main, name="quote-stream", daemon=True)
+                self._thread.start()
+        return self
+
+    def set_symbols(self, session, symbols):
+        """Declare the symbols ``session`` shows; call on every refresh to keep the lease alive."""
+        symbols = frozenset(s.upper() for s in symbols)
+        with self._lock:
+            previous, _ = self._sessions.get(session, (frozenset(), 0))
+            self._sessions[session] = (symbols, time.monotonic())
+            changed = self._retain(symbols - previous) | self._release(previous - symbols)
+        if changed:
+            self._poke()
+
+    def seed(self, quotes, requested=()):
+        """Store REST snapshots (``parse_quote`` dicts) for streamed symbols.
+
+        ``requested`` symbols missing from ``quotes`` are marked as seeded too,
+        so a symbol Polygon has no snapshot for is not asked for again.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for symbol in requested:
+                self._seeded_at[symbol] = now
+            for symbol, quote in quotes.items():
+                if quote.get("price") is not None:
+                    self._snapshots[symbol] = quote
+                    self._seeded_at[symbol] = now
+
+    def unseeded(self, symbols, max_age=None):
+        """Symbols never seeded, or, with ``max_age``, seeded longer ago than that."""
+        now = time.monotonic()
+        with self._lock:
+            return [s for s in symbols
+                    if s not in self._seeded_at or (max_age is not None and now - self._seeded_at[s] > max_age)]
+
+    def quotes(self, symbols):
+        """Latest quote per symbol, in ``parse_quote``'s schema plus ``bid``, ``ask`` and ``updated``.
+
+        Price and day change come from the newest tick; ``volume``, ``open``,
+        ``high`` and ``low`` come from the seed snapshot (high and low widened
+        to every price still in the tick buffer), so volume lags. A symbol without ticks gets its
+        snapshot as is; one with neither is left out.
+        """
+        out = {}
+        with self._lock:
+            for symbol in symbols:
+                snapshot = self._snapshots.get(symbol)
+                if snapshot is None:
+                    continue
+                buf = self._buffers.get(symbol)
+                price = np.nan
+                if buf is not None and buf.count:
+                    last = buf.last
+                    price = last["price"]
+                    if np.isnan(price):
+                        price = (last["bid"] + last["ask"]) / 2
+                if np.isnan(price):
+                    out[symbol] = dict(snapshot)
+                    continue
+                price = float(price)
+                # trades between two refreshes would otherwise never reach the day range
+                seen = np.append(buf.recent()["price"], price)
+                high, low = float(np.nanmax(seen)), float(np.nanmin(seen))
+                prev = snapshot["price"] - (snapshot.get("change") or 0)
+                out[symbol] = {
+                    "price": price,
+                    "change": price - prev,
+                    "change_percent": (price - prev) / prev * 100 if prev else 0,
+                    "volume": snapshot.get("volume", 0),
+                    "open": snapshot.get("open"),
+                    "high": max(high, snapshot.get("high") or high),
+                    "low": min(low, snapshot.get("low") or low),
+                    "bid": float(last["bid"]),
+                    "ask": float(last["ask"]),
+                    "updated": int(last["t"]),
+                }
+        return out
+
+    def recent(self, symbol):
+        with self._lock:
+            buf = self._buffers.get(symbol.upper())
+            return buf.recent() if buf else np.empty(0, dtype=TICK_DTYPE)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "connected": self.connected,
+                "symbols": len(self._refs),
+                "sessions": len(self._sessions),
+                "ticks": sum(b.count for b in self._buffers.values()),
+                "error": self.last_error,
+            }
+
+    def _retain(self, symbols):
+        fresh = {s for s in symbols if not self._refs[s]}
+        self._refs.update(symbols)
+        for s in fresh:
+            self._buffers[s] = TickBuffer(self.buffer_size)
+        return fresh
+
+    def _release(self, symbols):
+        self._refs.subtract(symbols)
+        gone = {s for s in symbols if self._refs[s] <= 0}
+        for s in gone:
+            del self._refs[s]
+            self._buffers.pop(s, None)
+            # re-seeded if watched again, the previous close may be a day old by then
+            self._snapshots.pop(s, None)
+            self._seeded_at.pop(s, None)
+        return gone
+
+    def _reap(self):
+        cutoff = time.monotonic() - SESSION_TTL
+        with self._lock:
+            stale = [s for s, (_, seen) in self._sessions.items() if seen < cutoff]
+            changed = set()
+            for session in stale:
+                symbols, _ = self._sessions.pop(session)
+                changed |= self._release(symbols)
+        return changed
+
+    def _poke(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    # --- consumer thread -----------------------------------------------
+
+    def _main(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._wake = asyncio.Event()
+        self._loop = loop
+        loop.run_until_complete(self._run())
+
+    async def _run(self):
+        try:
+            import websockets
+        except ImportError:
+            self.last_error = "websockets is not installed"
+            return
+
+        backoff = 1.0
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=20, max_size=2 ** 22) as ws:
+                    await self._auth(ws)
+                    self.connected, self.last_error, backoff = True, None, 1.0
+                    await self._serve(ws)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+            self.connected = False
+            await asyncio.sleep(backoff * random.uniform(0.5, 1.5))
+            backoff = min(30.0, backoff * 2)
+
+    async def _auth(self, ws):
+        await ws.send(json.dumps({"action": "auth", "params": self.api_key}))
+        while True:
+            statuses = {m.get("status") for m in json.loads(await asyncio.wait_for(ws.recv(), 10))}
+            if "auth_success" in statuses:
+                return
+            if "auth_failed" in statuses:
+                raise PermissionError("Polygon WebSocket authentication failed")
+
+    async def _serve(self, ws):
+        wire = set()
+        reader = asyncio.create_task(self._read(ws))
+        try:
+            while not reader.done():
+                self._reap()
+                with self._lock:
+                    wanted = set(self._refs)
+                await self._send(ws, "subscribe", wanted - wire)
+                await self._send(ws, "unsubscribe", wire - wanted)
+                wire = wanted
+                self._wake.clear()
+                waiter = asyncio.create_task(self._wake.wait())
+                await asyncio.wait({reader, waiter}, timeout=REAP_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+            reader.result()
+        finally:
+            reader.cancel()
+
+    async def _send(self, ws, action, symbols):
+        if symbols:
+            params = ",".join(f"{ev}.{s}" for s in sorted(symbols) for ev in ("T", "Q"))
+            await ws.send(json.dumps({"action": action, "params": params}))
+
+    async def _read(self, ws):
+        async for raw in ws:
+            events = json.loads(raw)
+            with self._lock:
+                for m in events:
+                    buf = self._buffers.get(m.get("sym"))
+                    if buf is None:
+                        continue
+                    if m["ev"] == "T":
+                        buf.append(m.get("t"), price=m.get("p"), size=m.get("s"))
+                    elif m["ev"] == "Q":
+                        buf.append(m.get("t"), bid=m.get("bp"), ask=m.get("ap"))
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def get_stream(api_key):
+    """Process-wide stream for ``api_key``, started on first use."""
+    with _streams_lock:
+        stream = _streams.get(api_key)
+        if stream is None:
+            stream = _streams[api_key] = QuoteStream(api_key)
+    return stream.start()
+
+
+# ----------------------------------------------------------------------
+# Recording and replay
+# ----------------------------------------------------------------------
+
+async def record(api_key, path, symbols, seconds, url=WS_URL):
+    """Append every trade/quote event for ``symbols`` to a JSONL file."""
+    import websockets
+
+    stream = QuoteStream(api_key, url)
+    deadline = time.monotonic() + seconds
+    async with websockets.connect(url) as ws:
+        await stream._auth(ws)
+        await stream._send(ws, "subscribe", set(symbols))
+        with open(path, "a") as f:
+            while time.monotonic() < deadline:
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                for m in json.loads(raw):
+                    if m.get("ev") in ("T", "Q"):
+                        f.write(json.dumps(m, separators=(",", ":")) + "\n")
+
+
+def load_ticks(path):
+    with open(path) as f:
+        ticks = [json.loads(line) for line in f if line.strip()]
+    return sorted(ticks, key=lambda m: m.get("t", 0))
+
+
+async def replay(path, host="localhost", port=8765, speed=1.0, ready=None):
+    """Serve recorded ticks over Polygon's WebSocket protocol, looping forever.
+
+    Each client gets its own replay, filtered to what it subscribed to and
+    re-stamped with the current time so the dashboard treats it as live.
+    ``port=0`` binds a free port; ``ready`` is called with the bound port once
+    the server is listening.
+    """
+    import websockets
+
+    ticks = load_ticks(path)
+    if not ticks:
+        raise SystemExit(f"no ticks in {path}")
+
+    async def client(ws):
+        subscribed = set()
+        await ws.send(json.dumps([{"ev": "status", "status": "connected", "message": "Connected Successfully"}]))
+
+        async def control():
+            async for raw in ws:
+                msg = json.loads(raw)
+                channels = {p.strip() for p in msg.get("params", "").split(",")}
+                if msg.get("action") == "auth":
+                    await ws.send(json.dumps([{"ev": "status", "status": "auth_success"}]))
+                elif msg.get("action") == "subscribe":
+                    subscribed.update(channels)
+                elif msg.get("action") == "unsubscribe":
+                    subscribed.difference_update(channels)
+
+        listener = asyncio.create_task(control())
+        try:
+            while not listener.done():
+                start, origin = time.time(), ticks[0]["t"]
+                for m in ticks:
+                    delay = (m["t"] - origin) / 1000 / speed - (time.time() - start)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    if f"{m['ev']}.{m['sym']}" in subscribed:
+                        await ws.send(json.dumps([{**m, "t": int(time.time() * 1000)}]))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            listener.cancel()
+
+    async with websockets.serve(client, host, port) as server:
+        port = server.sockets[0].getsockname()[1]
+        print(f"replaying {len(ticks)} ticks from {path} on ws://{host}:{port}")
+        if ready is not None:
+            ready(port)
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay Polygon WebSocket ticks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record")
+    rec.add_argument("path")
+    rec.add_argument("symbols", help="comma-separated tickers")
+    rec.add_argument("--seconds", type=float, default=300)
+    rep = sub.add_parser("replay")
+    rep.add_argument("path")
+    rep.add_argument("--host", default="localhost")
+    rep.add_argument("--port", type=int, default=8765)
+    rep.add_argument("--speed", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+        asyncio.run(record(os.environ["POLYGON_API_KEY"], args.path, symbols, args.seconds))
+    else:
+        asyncio.run(replay(args.path, args.host, args.port, args.speed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Multi-ticker screener: one call scans a whole universe.
+
+Bars for every ticker are refreshed concurrently through the bar store (so a
+repeat scan only downloads what is new), right-aligned on each ticker's own
+latest bar into a (tickers x bars) matrix and run through
+``indicators.compute`` once. Criteria are evaluated as
+array comparisons across the universe; options criteria only fetch chains for
+the names that already passed the price/indicator filters.
+
+Criteria are a small text language the agents can write directly, e.g.
+``"rsi < 30, close > sma200, avg_volume20 > 1e6"``: each clause compares a
+field with a number or another field.
+"""
+
+import asyncio
+import operator
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from bar_store import store as bar_store
+from options_chain import load_chain
+from polygon_client import MAX_CONCURRENCY, run_sync
+
+# enough history for SMA200 and a 52-week high
+LOOKBACK = 300
+# options chains fetched at most for this many pre-filtered names
+OPTIONS_CANDIDATES = 50
+OPTIONS_DAYS = 45
+
+OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+CLAUSE = re.compile(r"^\s*([a-z_0-9]+)\s*(<=|>=|==|!=|<|>)\s*([a-z_0-9.+-]+)\s*$", re.IGNORECASE)
+
+PRICE_FIELDS = [
+    "close", "change_1d_pct", "change_5d_pct", "change_20d_pct", "change_60d_pct",
+    "sma50", "sma200", "pct_above_sma50", "pct_above_sma200", "ema20", "rsi",
+    "macd", "macd_signal", "macd_hist", "bb_pct_b", "atr_pct", "vwap20",
+    "avg_volume20", "dollar_volume20", "pct_from_52w_high",
+]
+OPTIONS_FIELDS = ["options_volume", "put_call_volume", "put_call_oi", "atm_iv", "unusual_contracts"]
+DEFAULT_COLUMNS = ["close", "change_1d_pct", "rsi"]
+
+
+class ScreenError(ValueError):
+    pass
+
+
+def parse_criteria(criteria):
+    """``"rsi < 30, close > sma200"`` -> ``[("rsi", "<", 30.0), ("close", ">", "sma200")]``."""
+    clauses = []
+    for text in re.split(r",|\band\b", criteria or "", flags=re.IGNORECASE):
+        if not text.strip():
+            continue
+        match = CLAUSE.match(text)
+        if not match:
+            raise ScreenError(f"Cannot parse criterion {text.strip()!r}; use e.g. 'rsi < 30' or 'close > sma200'.")
+        field, op, rhs = match.groups()
+        try:
+            rhs = float(rhs)
+        except ValueError:
+            rhs = rhs.lower()
+        clauses.append((field.lower(), op, rhs))
+    known = set(PRICE_FIELDS) | set(OPTIONS_FIELDS)
+    for field, _, rhs in clauses:
+        for name in (field, rhs):
+            if isinstance(name, str) and name not in known:
+                raise ScreenError(f"Unknown field {name!r}. Available: {', '.join(PRICE_FIELDS + OPTIONS_FIELDS)}")
+    return clauses
+
+
+def load_bars(client, tickers, lookback=LOOKBACK, store=bar_store):
+    """Refresh bars concurrently and stack each ticker's last ``lookback`` bars.
+
+    Returns ``(tickers, fields)`` where each field is a (tickers x bars) array
+    whose last column is every ticker's own latest bar, so tickers refreshed
+    at different times or skipping illiquid days are still compared on their
+    latest data, exactly as the single-ticker tools see them. Shorter
+    histories are NaN-padded on the left. Tickers that fail or have no
+    history are dropped.
+    """
+    async def refresh():
+        return await asyncio.gather(*(asyncio.to_thread(store.update, client, t) for t in tickers),
+                                    return_exceptions=True)
+
+    loaded = [(t, bars) for t, bars in zip(tickers, run_sync(refresh()))
+              if not isinstance(bars, Exception) and len(bars)]
+    if not loaded:
+        return [], {}
+
+    width = min(lookback, max(len(bars) for _, bars in loaded))
+    fields = {name: np.full((len(loaded), width), np.nan) for name in ("o", "h", "l", "c", "v")}
+    for row, (_, bars) in enumerate(loaded):
+        recent = np.asarray(bars[-width:])
+        for name in fields:
+            fields[name][row, width - len(recent):] = recent[name]
+    return [t for t, _ in loaded], fields
+
+
+def _pct_change(close, periods):
+    if close.shape[1] <= periods:
+        return np.full(len(close), np.nan)
+    return (close[:, -1] / close[:, -1 - periods] - 1) * 100
+
+
+def price_fields(bars):
+    """One value per ticker for every field in ``PRICE_FIELDS``, from the latest bar."""
+    high, low, close, volume = bars["h"], bars["l"], bars["c"], bars["v"]
+    ind = {name: values[:, -1] for name, values in indicators.compute(high, low, close, volume).items()}
+    last = ind["close"]
+    band = ind["bb_upper"] - ind["bb_lower"]
+    avg_volume = indicators.sma(volume, 20)[:, -1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "close": last,
+            "change_1d_pct": _pct_change(close, 1),
+            "change_5d_pct": _pct_change(close, 5),
+            "change_20d_pct": _pct_change(close, 20),
+            "change_60d_pct": _pct_change(close, 60),
+            "sma50": ind["sma50"],
+            "sma200": ind["sma200"],
+            "pct_above_sma50": (last / ind["sma50"] - 1) * 100,
+            "pct_above_sma200": (last / ind["sma200"] - 1) * 100,
+            "ema20": ind["ema20"],
+            "rsi": ind["rsi"],
+            "macd": ind["macd"],
+            "macd_signal": ind["macd_signal"],
+            "macd_hist": ind["macd_hist"],
+            "bb_pct_b": np.where(band > 0, (last - ind["bb_lower"]) / band, np.nan),
+            "atr_pct": ind["atr"] / last * 100,
+            "vwap20": ind["vwap20"],
+            "avg_volume20": avg_volume,
+            "dollar_volume20": avg_volume * indicators.sma(close, 20)[:, -1],
+            "pct_from_52w_high": (last / np.nanmax(high[:, -252:], axis=1) - 1) * 100,
+        }
+
+
+def _chain_fields(chain, spot):
+    cols = chain.columns
+    is_call = cols["is_call"]
+    volume, oi = cols["volume"].astype(float), cols["open_interest"].astype(float)
+    call_vol, put_vol = volume[is_call].sum(), volume[~is_call].sum()
+    call_oi, put_oi = oi[is_call].sum(), oi[~is_call].sum()
+    atm_iv = np.nan
+    iv = cols["iv"]
+    if len(iv) and spot and np.isfinite(spot) and np.isfinite(iv).any():
+        # nearest expiry, strike closest to spot
+        near = cols["expiration"] == cols["expiration"][np.isfinite(iv)].min()
+        candidates = np.nonzero(near & np.isfinite(iv))[0]
+        atm_iv = iv[candidates[np.argmin(np.abs(cols["strike"][candidates] - spot))]]
+    return {
+        "options_volume": call_vol + put_vol,
+        "put_call_volume": put_vol / call_vol if call_vol else np.nan,
+        "put_call_oi": put_oi / call_oi if call_oi else np.nan,
+        "atm_iv": atm_iv,
+        "unusual_contracts": float(((oi > 0) & (volume > oi)).sum()),
+    }
+
+
+def options_fields(client, tickers, spots, days=OPTIONS_DAYS):
+    """Chain-level options fields for ``tickers``, expirations within ``days``."""
+    today = pd.Timestamp.today().normalize()
+    window = {"expiration_gte": today.strftime("%Y-%m-%d"),
+              "expiration_lte": (today + pd.Timedelta(days=days)).strftime("%Y-%m-%d")}
+    out = {name: np.full(len(tickers), np.nan) for name in OPTIONS_FIELDS}
+
+    def one(i):
+        try:
+            chain = load_chain(client, tickers[i], **window)
+        except Exception:
+            return
+        if len(chain):
+            for name, value in _chain_fields(chain, spots[i]).items():
+                out[name][i] = value
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENCY, len(tickers)))) as pool:
+        list(pool.map(one, range(len(tickers))))
+    return out
+
+
+def _mask(values, clauses, n):
+    keep = np.ones(n, dtype=bool)
+    for field, op, rhs in clauses:
+        right = values[rhs] if isinstance(rhs, str) else rhs
+        with np.errstate(invalid="ignore"):
+            keep &= OPS[op](values[field], right)
+    return keep
+
+
+def _order(values, sort_by, descending):
+    key = np.where(np.isnan(values), -np.inf if descending else np.inf, values)
+    return np.argsort(-key if descending else key, kind="stable")
+
+
+def screen_tickers(client, universe, criteria="", sort_by="change_1d_pct", descending=True, top=10,
+                   lookback=LOOKBACK):
+    """Scan ``universe`` and return the top matches as a DataFrame, plus scan counts.
+
+    Returns ``(frame, stats)``; ``frame`` holds the ticker, the sort field and
+    every field named in ``criteria``.
+    """
+    clauses = parse_criteria(criteria)
+    sort_by = sort_by.lower()
+    if sort_by not in PRICE_FIELDS and sort_by not in OPTIONS_FIELDS:
+        raise ScreenError(f"Unknown sort field {sort_by!r}.")
+    universe = list(dict.fromkeys(t.strip().upper() for t in universe if t.strip()))
+
+    tickers, bars = load_bars(client, universe, lookback)
+    stats = {"requested": len(universe), "scanned": len(tickers), "matched": 0}
+    if not tickers:
+        return pd.DataFrame(), stats
+
+    values = price_fields(bars)
+    price_clauses = [c for c in clauses if c[0] in values and (not isinstance(c[2], str) or c[2] in values)]
+    option_clauses = [c for c in clauses if c not in price_clauses]
+    keep = np.nonzero(_mask(values, price_clauses, len(tickers)))[0]
+
+    if option_clauses or sort_by in OPTIONS_FIELDS:
+        # chains are expensive: only the best pre-filtered names get one
+        if sort_by in values:
+            keep = keep[_order(values[sort_by][keep], sort_by, descending)]
+        keep = keep[:max(OPTIONS_CANDIDATES, top)]
+        values = {name: column[keep] for name, column in values.items()}
+        tickers = [tickers[i] for i in keep]
+        values.update(options_fields(client, tickers, values["close"]))
+        keep = np.nonzero(_mask(values, option_clauses, len(tickers)))[0]
+        stats["options_checked"] = len(tickers)
+
+    stats["matched"] = int(len(keep))
+    ranked = keep[_order(values[sort_by][keep], sort_by, descending)][:top]
+
+    columns = list(dict.fromkeys(
+        [sort_by] + [c[0] for c in clauses] + [c[2] for c in clauses if isinstance(c[2], str)] + DEFAULT_COLUMNS
+    ))
+    frame = pd.DataFrame({name: values[name][ranked] for name in columns})
+    frame.insert(0, "ticker", [tickers[i] for i in ranked])
+    return frame, stats
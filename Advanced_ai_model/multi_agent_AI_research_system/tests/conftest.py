@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# the terminal's modules are flat scripts next to this directory; keep their caches out of ~/.cache
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("BAR_STORE_DIR", tempfile.mkdtemp())
+os.environ.setdefault("KB_DIR", tempfile.mkdtemp())
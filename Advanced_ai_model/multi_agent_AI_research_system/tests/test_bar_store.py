@@ -0,0 +1,50 @@
+import numpy as np
+
+from bar_store import BarStore, SyntheticPolygon
+
+
+class Feed(SyntheticPolygon):
+    def __init__(self, bars):
+        super().__init__(bars)
+        self.paths = []
+
+    def get_json(self, path, params=None, use_cache=True):
+        self.paths.append(path)
+        return super().get_json(path, params, use_cache)
+
+    def split(self, ratio):
+        self.c = self.c / ratio
+
+
+def test_warm_update_only_fetches_the_tail(tmp_path):
+    feed = Feed(bars=500)
+    store = BarStore(str(tmp_path))
+    feed.t, full_t = feed.t[:400], feed.t
+    store.update(feed, "abc")
+    feed.t = full_t
+
+    bars = store.update(feed, "ABC")
+    assert len(bars) == 500
+    assert np.array_equal(bars["t"], feed.t)
+    assert feed.paths[-1].split("/")[-2] != "2020-01-01"
+    assert feed.bars_sent == 400 + 102
+
+
+def test_split_triggers_a_full_refetch(tmp_path):
+    feed = Feed(bars=300)
+    store = BarStore(str(tmp_path))
+    store.update(feed, "ABC")
+
+    feed.split(2)
+    bars = store.update(feed, "ABC")
+    assert feed.paths[-1].split("/")[-2] == "2020-01-01"
+    np.testing.assert_allclose(bars["c"], feed.c)
+
+
+def test_unchanged_history_is_not_refetched(tmp_path):
+    feed = Feed(bars=300)
+    store = BarStore(str(tmp_path))
+    store.update(feed, "ABC")
+    store.update(feed, "ABC")
+    assert len(feed.paths) == 2
+    assert feed.bars_sent == 300 + 2
@@ -0,0 +1,54 @@
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pypdf")
+fpdf = pytest.importorskip("fpdf")
+
+import kb_ingest
+from kb_ingest import KnowledgeIndex
+
+
+def make_pdf(pages):
+    pdf = fpdf.FPDF()
+    pdf.set_font("Helvetica", size=10)
+    for page in range(pages):
+        pdf.add_page()
+        pdf.multi_cell(0, 5, f"revenue guidance datacenter page{page} " * 40)
+    return bytes(pdf.output())
+
+
+def bag_of_words(texts, model=None):
+    vectors = np.zeros((len(texts), 64), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for word in text.split():
+            vectors[i, sum(map(ord, word)) % 64] += 1
+    return vectors
+
+
+def test_ingest_from_a_streamlit_style_main(tmp_path, monkeypatch):
+    # Streamlit runs the dashboard as a bare "__main__" module with a __file__;
+    # pool workers must not execute that file
+    marker = tmp_path / "dashboard-ran"
+    dashboard = tmp_path / "dashboard.py"
+    dashboard.write_text(f"open({str(marker)!r}, 'w').close()\n")
+    main = types.ModuleType("__main__")
+    main.__file__ = str(dashboard)
+    monkeypatch.setitem(sys.modules, "__main__", main)
+
+    index = KnowledgeIndex(str(tmp_path / "kb"), embed=bag_of_words)
+    data = make_pdf(20)
+    result = index.ingest("report.pdf", data)
+
+    assert result["status"] == "added" and result["pages"] == 20
+    assert not marker.exists()
+    assert main.__spec__ is None
+    assert kb_ingest.process_pool()._mp_context.get_start_method() in ("forkserver", "spawn")
+    # only the stored index is left behind, not the staged PDF
+    assert not [name for name in os.listdir(index.root) if name.endswith(".pdf")]
+
+    assert index.ingest("copy.pdf", data)["status"] == "duplicate"
+    assert index.search("page7", top=1)[0]["page"] == 8
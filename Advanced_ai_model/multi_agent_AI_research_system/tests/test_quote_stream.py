@@ -0,0 +1,135 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import pytest
+
+from polygon_client import parse_quote
+from quote_stream import QuoteStream, replay
+
+SNAPSHOT = {"ticker": "NVDA", "day": {"c": 505.0, "o": 498.0, "h": 506.0, "l": 497.0, "v": 1e6}, "prevDay": {"c": 500.0}}
+
+
+def stream_with(symbols):
+    # never started: ticks are appended to the buffers directly
+    stream = QuoteStream("key")
+    stream.set_symbols("session", symbols)
+    return stream
+
+
+def test_symbols_are_seeded_once():
+    stream = stream_with(["NVDA", "GONE"])
+    assert stream.unseeded(["NVDA", "GONE"]) == ["NVDA", "GONE"]
+    stream.seed({"NVDA": parse_quote(SNAPSHOT)}, ["NVDA", "GONE"])
+    # a symbol without a snapshot is not asked for again either
+    assert stream.unseeded(["NVDA", "GONE"]) == []
+    assert stream.unseeded(["NVDA"], max_age=60) == []
+
+
+def test_snapshot_refresh_backs_off_by_age(monkeypatch):
+    stream = stream_with(["NVDA"])
+    stream.seed({"NVDA": parse_quote(SNAPSHOT)}, ["NVDA"])
+    later = time.monotonic() + 31
+    monkeypatch.setattr("quote_stream.time.monotonic", lambda: later)
+    assert stream.unseeded(["NVDA"], max_age=30) == ["NVDA"]
+    assert stream.unseeded(["NVDA"]) == []
+
+
+def test_quotes_keep_the_parse_quote_schema():
+    stream = stream_with(["NVDA"])
+    assert stream.quotes(["NVDA"]) == {}
+    stream.seed({"NVDA": parse_quote(SNAPSHOT)}, ["NVDA"])
+    assert stream.quotes(["NVDA"])["NVDA"] == parse_quote(SNAPSHOT)
+
+    stream._buffers["NVDA"].append(1, price=510.0, size=10)
+    stream._buffers["NVDA"].append(2, bid=509.9, ask=510.1)
+    quote = stream.quotes(["NVDA"])["NVDA"]
+    assert set(parse_quote(SNAPSHOT)) <= set(quote)
+    assert quote["price"] == 510.0 and quote["change"] == 10.0 and quote["change_percent"] == 2.0
+    assert (quote["open"], quote["high"], quote["low"], quote["volume"]) == (498.0, 510.0, 497.0, 1e6)
+    assert (quote["bid"], quote["ask"], quote["updated"]) == (509.9, 510.1, 2)
+
+
+def test_day_range_covers_every_buffered_trade():
+    stream = stream_with(["NVDA"])
+    stream.seed({"NVDA": parse_quote(SNAPSHOT)}, ["NVDA"])
+    for t, price in enumerate([512.0, 495.0, 505.0]):
+        stream._buffers["NVDA"].append(t, price=price, size=1)
+    quote = stream.quotes(["NVDA"])["NVDA"]
+    assert (quote["price"], quote["high"], quote["low"]) == (505.0, 512.0, 495.0)
+
+
+def test_released_symbols_are_seeded_again():
+    stream = stream_with(["NVDA"])
+    stream.seed({"NVDA": parse_quote(SNAPSHOT)}, ["NVDA"])
+    stream.set_symbols("session", [])
+    stream.set_symbols("session", ["NVDA"])
+    assert stream.unseeded(["NVDA"]) == ["NVDA"]
+
+
+@contextmanager
+def replay_server(path, port=0):
+    # the replay CLI's server on its own loop; yields the bound port
+    loop = asyncio.new_event_loop()
+    bound = Future()
+    task = loop.create_task(replay(path, "127.0.0.1", port, ready=bound.set_result))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        yield bound.result(timeout=10)
+    finally:
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join(10)
+
+
+def wait_until(check, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not check():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+
+def test_replay_feeds_a_live_stream_across_a_reconnect(tmp_path):
+    pytest.importorskip("websockets")
+    path = tmp_path / "ticks.jsonl"
+    prices = [510.0, 514.0, 493.0, 508.0]
+    with open(path, "w") as f:
+        for i, price in enumerate(prices):
+            f.write(json.dumps({"ev": "T", "sym": "NVDA", "t": 1000 + 20 * i, "p": price, "s": 5}) + "\n")
+            f.write(json.dumps({"ev": "T", "sym": "TSLA", "t": 1005 + 20 * i, "p": 250.0, "s": 5}) + "\n")
+
+    with replay_server(path) as port:
+        stream = QuoteStream("key", url=f"ws://127.0.0.1:{port}")
+        stream.set_symbols("session", ["NVDA"])
+        stream.seed({"NVDA": parse_quote(SNAPSHOT)}, ["NVDA"])
+        # before the first tick the snapshot is served as is
+        assert stream.quotes(["NVDA"])["NVDA"] == parse_quote(SNAPSHOT)
+        stream.start()
+        wait_until(lambda: stream._buffers["NVDA"].count >= len(prices))
+        quote = stream.quotes(["NVDA"])["NVDA"]
+        assert quote["price"] in prices
+        assert (quote["high"], quote["low"], quote["open"]) == (514.0, 493.0, 498.0)
+        # only subscribed symbols are streamed
+        assert "TSLA" not in stream._buffers
+        assert stream.stats()["connected"]
+
+    wait_until(lambda: not stream.stats()["connected"])
+    ticks = stream._buffers["NVDA"].count
+
+    with replay_server(path, port):
+        wait_until(lambda: stream.stats()["connected"])
+        wait_until(lambda: stream._buffers["NVDA"].count > ticks)
+        assert stream.stats()["error"] is None
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from bar_store import BAR_DTYPE
+import screener
+from screener import load_bars, screen_tickers
+
+DAY = 86_400_000
+
+
+def history(days, start=100.0, drift=0.002, skip=()):
+    t = 1_600_000_000_000 + DAY * np.arange(days)
+    close = start * np.exp(drift * np.arange(days))
+    bars = np.zeros(days, dtype=BAR_DTYPE)
+    bars["t"], bars["o"], bars["h"], bars["l"], bars["c"], bars["v"] = t, close, close * 1.01, close * 0.99, close, 1e6
+    return np.delete(bars, list(skip))
+
+
+class FakeStore:
+    def __init__(self, histories):
+        self.histories = histories
+
+    def update(self, client, ticker):
+        if ticker not in self.histories:
+            raise KeyError(ticker)
+        return self.histories[ticker]
+
+
+@pytest.fixture
+def ragged(monkeypatch):
+    histories = {
+        "FRESH": history(260),                    # refreshed after today's close
+        "STALE": history(259),                    # not refreshed since yesterday
+        "GAPPY": history(260, skip=(100, 200)),   # illiquid, skipped two days
+        "YOUNG": history(60),                     # listed recently
+        "FALLING": history(259, drift=-0.002),
+    }
+    monkeypatch.setattr(screener.bar_store, "update", FakeStore(histories).update)
+    return histories
+
+
+def test_each_ticker_ends_on_its_own_latest_bar(ragged):
+    tickers, fields = load_bars(None, list(ragged) + ["MISSING"])
+    assert tickers == list(ragged)
+    for row, ticker in enumerate(tickers):
+        assert fields["c"][row, -1] == ragged[ticker]["c"][-1]
+    # shorter histories are only padded on the left
+    assert np.isnan(fields["c"][tickers.index("YOUNG"), :-60]).all()
+    assert not np.isnan(fields["c"][tickers.index("YOUNG"), -60:]).any()
+    assert not np.isnan(fields["c"][tickers.index("GAPPY"), 2:]).any()
+
+
+def test_ragged_histories_all_screen(ragged):
+    frame, stats = screen_tickers(None, list(ragged), "close > 0", top=10)
+    assert stats["matched"] == 5
+    frame, stats = screen_tickers(None, list(ragged), "close > sma200", top=10)
+    assert sorted(frame["ticker"]) == ["FRESH", "GAPPY", "STALE"]
+    assert not frame["sma200"].isna().any()
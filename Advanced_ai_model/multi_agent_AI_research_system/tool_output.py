@@ -0,0 +1,246 @@
+"""Token-budgeted encoding of tool results before they reach the LLM.
+
+Tools return dicts, record lists and DataFrames that are convenient for the
+dashboard but expensive as prompt text (365 daily dicts with ISO dates, whole
+option chains). ``compact`` wraps a tool so its result is rendered as short
+``key: value`` lines and CSV tables that fit a token budget:
+
+- long time series get summary statistics over the full history plus an
+  OHLCV-aware downsample (bucket open/high/low/close/volume are aggregated,
+  not just sampled);
+- other tables keep the top-K rows by a relevance score, or an even sample
+  when there is none;
+- numbers are printed with only the precision an analyst needs.
+
+Tokens are counted with ``tiktoken`` when it is installed and fall back to a
+4-characters-per-token estimate otherwise.
+"""
+
+import functools
+import json
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_TOKENS", "1500"))
+TOKEN_ENCODING = os.getenv("TOOL_OUTPUT_ENCODING", "o200k_base")
+
+# how bucketed bars combine when a series is downsampled; other columns keep the bucket's last value
+SERIES_AGG = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+DATE_COLUMNS = ("date", "Date", "timestamp", "t")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:
+        # not installed, or the BPE file cannot be fetched offline
+        return None
+
+
+def count_tokens(text):
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def fmt(value):
+    """Compact text for one cell: no trailing zeros, ~4 significant digits below 100."""
+    if value is None:
+        return ""
+    if isinstance(value, (bool, np.bool_)):
+        return "true" if value else "false"
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        if math.isnan(value) or math.isinf(value):
+            return "" if math.isnan(value) else ("inf" if value > 0 else "-inf")
+        if value == int(value) and abs(value) < 1e15:
+            return str(int(value))
+        if abs(value) >= 100:
+            return f"{value:.2f}".rstrip("0").rstrip(".")
+        return f"{value:.4g}"
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+def csv(frame):
+    lines = [",".join(map(str, frame.columns))]
+    lines.extend(",".join(fmt(v) for v in row) for row in frame.itertuples(index=False, name=None))
+    return "\n".join(lines)
+
+
+def _fit_rows(frame, budget, pick):
+    """Largest k for which ``csv(pick(k))`` fits ``budget`` tokens."""
+    text = csv(frame)
+    if count_tokens(text) <= budget or len(frame) <= 1:
+        return frame, text
+    per_row = max(1.0, count_tokens(text) / (len(frame) + 1))
+    k = max(1, min(len(frame) - 1, int(budget / per_row) - 1))
+    while True:
+        subset = pick(k)
+        text = csv(subset)
+        if k == 1 or count_tokens(text) <= budget:
+            return subset, text
+        k = max(1, int(k * 0.8))
+
+
+def _relevance(frame, rank_by):
+    if rank_by is None:
+        return None
+    if callable(rank_by):
+        return np.asarray(rank_by(frame), dtype=float)
+    if rank_by in frame:
+        return pd.to_numeric(frame[rank_by], errors="coerce").abs().to_numpy(dtype=float)
+    return None
+
+
+def table(frame, budget=TOKEN_BUDGET, rank_by=None):
+    """CSV text for ``frame`` in at most ``budget`` tokens.
+
+    With ``rank_by`` (a column or ``frame -> scores``) the most relevant rows
+    are kept, in their original order; otherwise rows are sampled evenly,
+    always keeping the first and last.
+    """
+    frame = frame.reset_index(drop=True)
+    if frame.empty:
+        return "(no rows)"
+    scores = _relevance(frame, rank_by)
+    if scores is not None:
+        order = np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind="stable")
+        pick = lambda k: frame.iloc[np.sort(order[:k])]
+        how = "most relevant"
+    else:
+        pick = lambda k: frame.iloc[np.unique(np.linspace(0, len(frame) - 1, k).round().astype(int))]
+        how = "evenly sampled"
+    subset, text = _fit_rows(frame, budget, pick)
+    if len(subset) < len(frame):
+        text = f"# {len(subset)} of {len(frame)} rows, {how}\n{text}"
+    return text
+
+
+def _date_column(frame):
+    return next((c for c in DATE_COLUMNS if c in frame), None)
+
+
+def series_stats(frame):
+    """Summary over the full series, so nothing is lost by downsampling."""
+    date = _date_column(frame)
+    stats = {"bars": len(frame)}
+    if date:
+        stats["from"], stats["to"] = fmt(frame[date].iloc[0]), fmt(frame[date].iloc[-1])
+    if "close" in frame:
+        close = pd.to_numeric(frame["close"], errors="coerce")
+        returns = close.pct_change()
+        stats.update({
+            "first_close": close.iloc[0],
+            "last_close": close.iloc[-1],
+            "return_pct": (close.iloc[-1] / close.iloc[0] - 1) * 100 if close.iloc[0] else None,
+            "min_close": close.min(),
+            "max_close": close.max(),
+            "max_drawdown_pct": ((close / close.cummax() - 1).min()) * 100,
+            "ann_vol_pct": returns.std() * math.sqrt(252) * 100,
+        })
+    if "volume" in frame:
+        stats["avg_volume"] = pd.to_numeric(frame["volume"], errors="coerce").mean()
+    return stats
+
+
+def downsample(frame, points):
+    """``points`` consecutive buckets, OHLCV columns aggregated per bucket."""
+    if len(frame) <= points:
+        return frame
+    bucket = np.arange(len(frame)) * points // len(frame)
+    agg = {c: SERIES_AGG.get(c, "last") for c in frame.columns}
+    return frame.groupby(bucket).agg(agg).reset_index(drop=True)
+
+
+def series(frame, budget=TOKEN_BUDGET):
+    """Statistics line plus the longest OHLCV downsample that fits ``budget``."""
+    head = "stats: " + ", ".join(f"{k}={fmt(v)}" for k, v in series_stats(frame).items())
+    remaining = max(50, budget - count_tokens(head))
+    subset, text = _fit_rows(frame, remaining, lambda k: downsample(frame, k))
+    if len(subset) < len(frame):
+        text = f"# {len(subset)} buckets of ~{len(frame) / len(subset):.1f} bars (open first, high max, low min, close last, volume sum)\n{text}"
+    return f"{head}\n{text}"
+
+
+def _is_records(value):
+    return isinstance(value, list) and value and all(isinstance(v, dict) for v in value)
+
+
+def _is_keyed_rows(value):
+    return (isinstance(value, dict) and len(value) > 1
+            and all(isinstance(v, dict) and not any(isinstance(x, (dict, list)) for x in v.values())
+                    for v in value.values()))
+
+
+def _is_tabular(value):
+    return isinstance(value, pd.DataFrame) or _is_records(value)
+
+
+def _block(value, budget, rank_by):
+    frame = value if isinstance(value, pd.DataFrame) else pd.DataFrame(value)
+    if _date_column(frame) and rank_by is None and len(frame) > 2:
+        return series(frame, budget)
+    return table(frame, budget, rank_by)
+
+
+def encode(value, budget=TOKEN_BUDGET, rank_by=None):
+    """Render a tool result as compact text within roughly ``budget`` tokens."""
+    if isinstance(value, str):
+        if count_tokens(value) <= budget:
+            return value
+        return value[:budget * 4] + " …(truncated)"
+    if _is_tabular(value):
+        return _block(value, budget, rank_by)
+    if _is_keyed_rows(value):
+        # {"AAPL": {...}, "MSFT": {...}} reads best as one table
+        return table(pd.DataFrame.from_dict(value, orient="index").rename_axis("key").reset_index(), budget, rank_by)
+    if isinstance(value, dict):
+        scalars = {k: v for k, v in value.items() if not _is_tabular(v)}
+        blocks = {k: v for k, v in value.items() if _is_tabular(v)}
+        lines = [f"{k}: {_scalar(v)}" for k, v in scalars.items()]
+        spent = count_tokens("\n".join(lines))
+        share = max(50, (budget - spent) // max(1, len(blocks)))
+        lines.extend(f"{k}:\n{_block(v, share, rank_by)}" for k, v in blocks.items())
+        return "\n".join(lines)
+    return _scalar(value)
+
+
+def _scalar(value):
+    if isinstance(value, (list, tuple)) and all(not isinstance(v, (dict, list)) for v in value):
+        return ", ".join(fmt(v) for v in value)
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, default=fmt, separators=(",", ":"))
+    return fmt(value)
+
+
+def compact(budget=None, rank_by=None):
+    """Decorator for agent tools: the wrapped tool returns ``encode``d text.
+
+    Sits under ``@tool`` so the tool keeps its name, signature and docstring.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return encode(func(*args, **kwargs), budget or TOKEN_BUDGET, rank_by)
+        return wrapper
+    return decorate
+
+
+def chain_relevance(frame):
+    """Rank option contracts by activity: traded volume, open interest and the unusual flag."""
+    def column(name):
+        if name not in frame:
+            return np.zeros(len(frame))
+        return pd.to_numeric(frame[name], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+    return np.log1p(column("Volume")) + 0.5 * np.log1p(column("Open Interest")) + column("Unusual")